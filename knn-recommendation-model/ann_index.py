@@ -0,0 +1,289 @@
+"""
+Approximate nearest-neighbor index for the KNN movie recommender.
+
+Random-projection LSH over cosine similarity, written with NumPy / SciPy only so
+it runs in the same notebook runtime as scikit-learn's brute-force model and
+exposes the same fit / kneighbors interface. ExactCosineNeighbors is the exact
+search over the same normalized rows, used for artifacts of the 'brute' engine.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class RandomProjectionLSH:
+    """
+    Cosine nearest neighbors from random-hyperplane hash tables
+
+    Every table hashes a row to the signs of `n_bits` random projections.
+    Rows sharing a bucket with the query in any table (or in a bucket one bit
+    flip away, if `n_probes` > 0) become candidates, and candidates are
+    re-ranked by their exact cosine distance.
+
+    Recall / speed trade-off:
+    - more `n_tables` or `n_probes` -> more candidates, higher recall, slower
+    - more `n_bits` -> smaller buckets, fewer candidates, faster, lower recall
+    - `max_candidates` caps the rows re-ranked per query, keeping those that
+      share a bucket with the query in the most tables
+    By default `n_bits` grows with log2 of the user count, so buckets hold
+    about 8 users whatever the table size. benchmarks/ann_recall.py reports
+    recall@10 and speed against brute force for a grid of settings.
+
+    Parameters:
+    n_neighbors (int): default neighbors returned by kneighbors
+    n_tables (int): number of hash tables
+    n_bits (int): hyperplanes per table, None to derive it from the number of users
+    n_probes (int): extra buckets probed per table, each one bit flip away
+    max_candidates (int): most rows re-ranked per query, None for no cap
+    chunk_size (int): queries per block; bounds the (chunk x distinct candidates) similarity block
+    random_state (int): seed for the hyperplanes
+
+    Attributes:
+    n_bits_ (int): hyperplanes per table used by the fitted tables
+    """
+
+    def __init__(self, n_neighbors=10, n_tables=64, n_bits=None, n_probes=2, max_candidates=256,
+                 chunk_size=32, random_state=0):
+        self.n_neighbors = n_neighbors
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.n_probes = n_probes
+        self.max_candidates = max_candidates
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def fit(self, X):
+        """
+        Hash every row of X into the tables
+
+        Parameters:
+        X (csr_matrix): users x items ratings
+
+        Returns:
+        RandomProjectionLSH: self
+        """
+        self.n_bits_ = self.n_bits or default_n_bits(X.shape[0])
+        rng = np.random.default_rng(self.random_state)
+        self.planes_ = rng.standard_normal((X.shape[1], self.n_tables * self.n_bits_)).astype(np.float32)
+        self.X_ = _normalize_rows(X)
+        # Ratings are all positive, so hash around the mean row to spread users across buckets
+        self.offset_ = np.asarray(self.X_.mean(axis=0)).ravel().astype(np.float32) @ self.planes_
+
+        codes = self._hash(self.X_)
+        self.order_ = np.argsort(codes, axis=0, kind='stable').astype(np.int32)
+        self.sorted_codes_ = np.take_along_axis(codes, self.order_, axis=0)
+        return self
+
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """
+        Approximate cosine neighbors of every row of X
+
+        Parameters:
+        X (csr_matrix): query rows
+        n_neighbors (int): neighbors per row, defaults to the constructor value
+        return_distance (bool): also return the cosine distances
+
+        Returns:
+        tuple: (distances, indices) of shape (queries, n_neighbors), or only indices
+        """
+        n_neighbors = n_neighbors or self.n_neighbors
+        queries = _normalize_rows(X)
+        indices = np.empty((queries.shape[0], n_neighbors), dtype=np.int64)
+        distances = np.empty((queries.shape[0], n_neighbors), dtype=np.float64)
+        for start in range(0, queries.shape[0], self.chunk_size):
+            stop = min(start + self.chunk_size, queries.shape[0])
+            distances[start:stop], indices[start:stop] = self._search(queries[start:stop], n_neighbors)
+
+        if return_distance:
+            return distances, indices
+        return indices
+
+    def _search(self, queries, n_neighbors):
+        query_rows, candidates = self._candidates(queries)
+
+        # One sparse product of the chunk against its distinct candidate rows, read back per pair
+        rows, columns = np.unique(candidates, return_inverse=True)
+        block = (queries @ self.X_[rows].T).toarray()
+        similarities = block[query_rows, columns]
+
+        # Best n_neighbors per query: sort by query, then similarity desc, then row
+        order = np.lexsort((candidates, -similarities, query_rows))
+        query_rows, candidates, similarities = query_rows[order], candidates[order], similarities[order]
+        group_starts = np.searchsorted(query_rows, np.arange(queries.shape[0]))
+        rank = np.arange(len(query_rows)) - group_starts[query_rows]
+        keep = rank < n_neighbors
+
+        indices = np.empty((queries.shape[0], n_neighbors), dtype=np.int64)
+        distances = np.empty((queries.shape[0], n_neighbors), dtype=np.float64)
+        counts = np.bincount(query_rows[keep], minlength=queries.shape[0])
+        complete = counts == n_neighbors
+        filled = keep & complete[query_rows]
+        indices[complete] = candidates[filled].reshape(-1, n_neighbors)
+        distances[complete] = 1 - similarities[filled].reshape(-1, n_neighbors)
+
+        # Queries whose buckets hold too few rows fall back to an exact scan
+        if not complete.all():
+            missing = np.flatnonzero(~complete)
+            exact_distances, exact_indices = self._exact(queries[missing], n_neighbors)
+            indices[missing] = exact_indices
+            distances[missing] = exact_distances
+        return distances, indices
+
+    def _hash(self, X):
+        bits = (X @ self.planes_) > self.offset_
+        bits = bits.reshape(X.shape[0], self.n_tables, self.n_bits_)
+        weights = np.left_shift(np.int64(1), np.arange(self.n_bits_, dtype=np.int64))
+        return bits @ weights
+
+    def _candidates(self, queries):
+        codes = self._hash(queries)
+        flips = np.left_shift(np.int64(1), np.arange(min(self.n_probes, self.n_bits_), dtype=np.int64))
+        query_rows, candidates = [], []
+        for table in range(self.n_tables):
+            for probe in np.concatenate([[0], flips]):
+                probe_codes = codes[:, table] ^ probe
+                lo = np.searchsorted(self.sorted_codes_[:, table], probe_codes, side='left')
+                hi = np.searchsorted(self.sorted_codes_[:, table], probe_codes, side='right')
+                counts = hi - lo
+                positions = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+                query_rows.append(np.repeat(np.arange(queries.shape[0]), counts))
+                candidates.append(self.order_[positions, table])
+
+        # A row found in several tables is only a candidate once
+        n_rows = self.X_.shape[0]
+        pairs, hits = np.unique(np.concatenate(query_rows).astype(np.int64) * n_rows + np.concatenate(candidates),
+                                return_counts=True)
+        query_rows, candidates = pairs // n_rows, pairs % n_rows
+        if self.max_candidates:
+            # Over the cap, keep the rows sharing a bucket with the query in the most tables
+            order = np.lexsort((candidates, -hits, query_rows))
+            rank = np.arange(len(order)) - np.searchsorted(query_rows, query_rows[order])
+            keep = np.sort(order[rank < self.max_candidates])
+            query_rows, candidates = query_rows[keep], candidates[keep]
+        return query_rows, candidates
+
+    def _exact(self, queries, n_neighbors):
+        similarities = (queries @ self.X_.T).toarray()
+        indices = np.argsort(-similarities, axis=1, kind='stable')[:, :n_neighbors]
+        return 1 - np.take_along_axis(similarities, indices, axis=1), indices
+
+
+class ExactCosineNeighbors:
+    """
+    Exact cosine nearest neighbors straight on L2-normalized CSR rows
+
+    The same cosine neighbors as NearestNeighbors(metric='cosine',
+    algorithm='brute'), except among rows tied at the k-th similarity:
+    NearestNeighbors picks any of them, here the lowest rows win, so every
+    process and chunking returns the same lists. Unlike NearestNeighbors.fit,
+    nothing is copied when X_ is set from memory-mapped arrays (see
+    artifact.load_artifact), so worker processes share the ratings instead of
+    each holding its own copy. make_neighbor_model('brute') returns this
+    class, so in-process, sharded and served scoring agree.
+
+    Parameters:
+    n_neighbors (int): default neighbors returned by kneighbors
+    chunk_size (int): queries per similarity block in kneighbors
+
+    Attributes:
+    X_ (csr_matrix): unit-length rows of the fitted ratings
+    """
+
+    def __init__(self, n_neighbors=10, chunk_size=1024):
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+
+    def fit(self, X):
+        self.X_ = _normalize_rows(X)
+        return self
+
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """
+        Cosine neighbors of every row of X among the fitted rows
+
+        Parameters:
+        X (csr_matrix): query rows
+        n_neighbors (int): neighbors per row, defaults to the constructor value
+        return_distance (bool): also return the cosine distances
+
+        Returns:
+        tuple: (distances, indices) of shape (queries, n_neighbors), or only indices
+        """
+        n_neighbors = n_neighbors or self.n_neighbors
+        queries = _normalize_rows(X)
+        indices = np.empty((queries.shape[0], n_neighbors), dtype=np.int64)
+        distances = np.empty((queries.shape[0], n_neighbors), dtype=np.float64)
+        for start in range(0, queries.shape[0], self.chunk_size):
+            # Dense queries against the sparse rows: the block is mostly non-zero, a sparse product would be slower
+            similarities = queries[start:start + self.chunk_size].toarray() @ self.X_.T
+            top, top_similarities = _top_k(similarities, n_neighbors)
+            indices[start:start + len(top)] = top
+            distances[start:start + len(top)] = 1 - top_similarities
+
+        if return_distance:
+            return distances, indices
+        return indices
+
+
+def _top_k(scores, k):
+    """
+    Columns of the k highest scores per row, highest first, ties going to the lowest column
+
+    np.argpartition picks k columns in linear time. Rows where it had to
+    choose among columns tied at the k-th score are redone keeping everything
+    above that score and the lowest tied columns, so the result does not
+    depend on the partition. Shared by recommender.top_n and the exact
+    neighbor searches.
+
+    Returns:
+    tuple: (columns, scores) arrays, both of shape (rows, k)
+    """
+    k = min(k, scores.shape[1])
+    if k == 0 or k == scores.shape[1]:
+        columns = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        return columns, np.take_along_axis(scores, columns, axis=1)
+
+    columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    selected = np.take_along_axis(scores, columns, axis=1)
+    threshold = selected.min(axis=1, keepdims=True)
+    # Only rows with more columns tied at the k-th score than were picked need the lowest ones chosen
+    ambiguous = np.flatnonzero((scores == threshold).sum(axis=1) > (selected == threshold).sum(axis=1))
+    if len(ambiguous):
+        rows, row_threshold = scores[ambiguous], threshold[ambiguous]
+        above = rows > row_threshold
+        tied = rows == row_threshold
+        room = k - above.sum(axis=1, keepdims=True)
+        keep = above | (tied & (np.cumsum(tied, axis=1, dtype=np.int32) <= room))
+        columns[ambiguous] = np.nonzero(keep)[1].reshape(-1, k)
+        selected[ambiguous] = np.take_along_axis(rows, columns[ambiguous], axis=1)
+
+    # Highest score first, then lowest column
+    order = np.lexsort((columns, -selected), axis=1)
+    return np.take_along_axis(columns, order, axis=1), np.take_along_axis(selected, order, axis=1)
+
+
+def default_n_bits(n_rows):
+    """Hyperplanes per table that split n_rows rows into buckets of about 8"""
+    return int(np.clip(np.round(np.log2(max(n_rows, 1) / 8)), 4, 62))
+
+
+def _normalize_rows(X):
+    X = csr_matrix(X, dtype=np.float32, copy=True)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    X.data /= np.repeat(norms, np.diff(X.indptr)).astype(np.float32)
+    return X
+
+
+def neighbor_recall(exact_indices, approx_indices):
+    """
+    Mean fraction of the exact neighbors found by the approximate index (recall@k)
+
+    Parameters:
+    exact_indices (np.ndarray): brute-force kneighbors indices
+    approx_indices (np.ndarray): approximate kneighbors indices, same shape
+
+    Returns:
+    float: recall@k averaged over the queries
+    """
+    hits = [len(np.intersect1d(exact, approx)) for exact, approx in zip(exact_indices, approx_indices)]
+    return float(np.sum(hits)) / exact_indices.size
@@ -0,0 +1,213 @@
+"""
+On-disk artifact for the fitted KNN movie recommender.
+
+The artifact is a directory of .npy files plus a small manifest.json. Loading
+memory-maps the arrays (np.load(mmap_mode='r')), so a worker starts in
+milliseconds and processes on the same host share the pages instead of each
+rebuilding the model from the ratings table.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from ann_index import ExactCosineNeighbors, RandomProjectionLSH, _normalize_rows
+from item_item import ItemNeighbors
+from latent import LatentNeighbors
+from recommender import UserItemMatrix, title_array
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+class RecommenderArtifact:
+    """
+    Fitted recommender state loaded from disk
+
+    Attributes:
+    user_item (UserItemMatrix): ratings CSR and id maps
+    model (ExactCosineNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors): fitted model, or None;
+        a 'brute' model, ExactCosineNeighbors or NearestNeighbors, is loaded as ExactCosineNeighbors
+    engine (str): engine name accepted by make_neighbor_model, or None
+    titles (np.ndarray): TITLE of each item column, or None
+    top_columns, top_scores (np.ndarray): precomputed top-N per matrix row (see save_top_n), or None
+    top_n_neighbors (int): n_neighbors the top-N was scored with, or None
+    """
+
+    def __init__(self, user_item, model=None, engine=None, titles=None, top_columns=None, top_scores=None,
+                 top_n_neighbors=None):
+        self.user_item = user_item
+        self.model = model
+        self.engine = engine
+        self.titles = titles
+        self.top_columns = top_columns
+        self.top_scores = top_scores
+        self.top_n_neighbors = top_n_neighbors
+
+
+def save_artifact(path, user_item, model=None, movie_titles=None):
+    """
+    Write the fitted state to `path`, replacing any previous artifact there
+
+    The files are written to a sibling directory first and swapped in at the
+    end, so readers never see a half-written artifact.
+
+    Parameters:
+    path (str): artifact directory
+    user_item (UserItemMatrix): ratings the model was fitted on
+    model (ExactCosineNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors): fitted model, optional
+    movie_titles (pd.DataFrame): ITEM_ID / TITLE lookup, optional
+    """
+    staging = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    arrays = {
+        'data': user_item.matrix.data,
+        'indices': user_item.matrix.indices,
+        'indptr': user_item.matrix.indptr,
+        'user_ids': user_item.user_ids,
+        'item_ids': user_item.item_ids,
+    }
+    if movie_titles is not None:
+        arrays['titles'] = title_array(movie_titles, user_item.item_ids)
+
+    engine, params = _describe(model)
+    if engine == 'brute':
+        # Stored normalized so a loaded model searches the mapped values as they are
+        arrays['brute_data'] = model.X_.data if isinstance(model, ExactCosineNeighbors) else \
+            _normalize_rows(user_item.matrix).data
+    elif engine == 'lsh':
+        # X_ has the same sparsity as the ratings, only its normalized values are stored
+        arrays.update({
+            'lsh_data': model.X_.data, 'lsh_planes': model.planes_, 'lsh_offset': model.offset_,
+            'lsh_order': model.order_, 'lsh_sorted_codes': model.sorted_codes_,
+        })
+    elif engine == 'svd':
+        arrays.update({'svd_components': model.components_, 'svd_embeddings': model.embeddings_})
+    elif engine == 'item':
+        arrays.update({'item_neighbors': model.neighbors_, 'item_similarities': model.similarities_})
+
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, name + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+    high_water = user_item.high_water
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'shape': list(user_item.shape),
+        'engine': engine,
+        'params': params,
+        'high_water': None if high_water is None else str(high_water),
+        'high_water_is_timestamp': isinstance(high_water, pd.Timestamp),
+    }
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(staging, path)
+
+
+def load_artifact(path, mmap_mode='r'):
+    """
+    Load an artifact written by save_artifact, memory-mapping its arrays
+
+    Parameters:
+    path (str): artifact directory
+    mmap_mode (str): np.load mmap_mode, None to read the arrays into memory
+
+    Returns:
+    RecommenderArtifact: matrix, model and titles ready for inference
+    """
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest['format_version']} in {path}")
+
+    def array(name):
+        file = os.path.join(path, name + '.npy')
+        return np.load(file, mmap_mode=mmap_mode, allow_pickle=False) if os.path.exists(file) else None
+
+    shape = tuple(manifest['shape'])
+    indices, indptr = array('indices'), array('indptr')
+    matrix = csr_matrix((array('data'), indices, indptr), shape=shape, copy=False)
+
+    high_water = manifest['high_water']
+    if high_water is not None and manifest['high_water_is_timestamp']:
+        high_water = pd.Timestamp(high_water)
+    user_item = UserItemMatrix(matrix, array('user_ids'), array('item_ids'), high_water)
+
+    engine, params = manifest['engine'], manifest['params']
+    model = None
+    if engine == 'brute':
+        # Searched straight on the mapped arrays; NearestNeighbors.fit would copy them into every process
+        model = ExactCosineNeighbors(**params)
+        brute_data = array('brute_data')
+        if brute_data is None:
+            model.fit(matrix)
+        else:
+            model.X_ = csr_matrix((brute_data, indices, indptr), shape=shape, copy=False)
+    elif engine == 'lsh':
+        model = RandomProjectionLSH(**params)
+        model.X_ = csr_matrix((array('lsh_data'), indices, indptr), shape=shape, copy=False)
+        model.planes_ = array('lsh_planes')
+        model.n_bits_ = model.planes_.shape[1] // model.n_tables
+        model.offset_ = array('lsh_offset')
+        model.order_ = array('lsh_order')
+        model.sorted_codes_ = array('lsh_sorted_codes')
+    elif engine == 'svd':
+        model = LatentNeighbors(**params)
+        model.components_ = array('svd_components')
+        model.embeddings_ = array('svd_embeddings')
+    elif engine == 'item':
+        model = ItemNeighbors(**params)
+        model.neighbors_ = array('item_neighbors')
+        model.similarities_ = array('item_similarities')
+        model.weights_ = model.weights()
+
+    return RecommenderArtifact(user_item, model, engine, array('titles'), array('top_columns'), array('top_scores'),
+                               manifest.get('top_n_neighbors'))
+
+
+def save_top_n(path, columns, scores, n_neighbors):
+    """
+    Add precomputed top-N arrays (from recommender.precompute_top_n) to a saved artifact
+
+    Parameters:
+    path (str): artifact directory written by save_artifact
+    columns (np.ndarray): int32 (users x N) item columns, -1 for rows not computed
+    scores (np.ndarray): float32 (users x N) scores
+    n_neighbors (int): n_neighbors the arrays were scored with, so users scored later match them
+    """
+    for name, array in (('top_columns', columns), ('top_scores', scores)):
+        # Write aside and rename so a reader never maps a partial file
+        staging = os.path.join(path, name + '.tmp.npy')
+        np.save(staging, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(staging, os.path.join(path, name + '.npy'))
+
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    manifest['top_n_neighbors'] = int(n_neighbors)
+    staging = os.path.join(path, MANIFEST + '.tmp')
+    with open(staging, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(staging, os.path.join(path, MANIFEST))
+
+
+def _describe(model):
+    if model is None:
+        return None, {}
+    if isinstance(model, RandomProjectionLSH):
+        return 'lsh', {'n_neighbors': model.n_neighbors, 'n_tables': model.n_tables, 'n_bits': model.n_bits,
+                       'n_probes': model.n_probes, 'max_candidates': model.max_candidates,
+                       'chunk_size': model.chunk_size, 'random_state': model.random_state}
+    if isinstance(model, LatentNeighbors):
+        return 'svd', {'n_neighbors': model.n_neighbors, 'n_components': model.n_components,
+                       'n_iter': model.n_iter, 'chunk_size': model.chunk_size, 'random_state': model.random_state}
+    if isinstance(model, ItemNeighbors):
+        return 'item', {'n_neighbors': model.n_neighbors, 'chunk_size': model.chunk_size}
+    if isinstance(model, ExactCosineNeighbors):
+        return 'brute', {'n_neighbors': model.n_neighbors, 'chunk_size': model.chunk_size}
+    return 'brute', {'n_neighbors': model.n_neighbors}
@@ -0,0 +1,108 @@
+"""
+Recall@10 and speed of the LSH index and the SVD latent engine against brute-force cosine KNN on the bundled ma301 data.
+
+Runs locally, without a Snowflake session. Brute force cost grows with the
+number of users for every query while LSH re-ranks at most max_candidates
+rows, so LSH only pays off on large tables. --synthetic-users scales ma301 up
+(each synthetic user keeps a random 70% of a real user's ratings) to show it:
+
+    python benchmarks/ann_recall.py
+    python benchmarks/ann_recall.py --tables 16 32 64 --bits 6 8 --probes 0 2 --components 32 64 128
+    python benchmarks/ann_recall.py --synthetic-users 120000 --queries 1000 --tables 64 --probes 2 --max-candidates 256
+
+On a single core the last one gives recall@10 0.78 for the default LSH
+settings (64 tables, 14 bits derived from the user count, 2 probes, 256
+candidates) at about 2x the speed of brute force (1.85s against 3.98s). On
+the 943 ma301 users brute force stays faster.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+from ann_index import neighbor_recall  # noqa: E402
+from recommender import build_user_item_matrix, make_neighbor_model  # noqa: E402
+
+
+def synthetic_users(X, n_users, keep=0.7, random_state=0):
+    """n_users rows, each a random `keep` share of the ratings of a random row of X"""
+    rng = np.random.default_rng(random_state)
+    synthetic = X[rng.integers(0, X.shape[0], n_users)].tocsr()
+    synthetic.data[rng.random(synthetic.nnz) >= keep] = 0
+    synthetic.eliminate_zeros()
+    return synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ratings', default=os.path.join(MODEL_DIR, 'ma301_user_ratings.csv'))
+    parser.add_argument('--neighbors', type=int, default=10)
+    parser.add_argument('--synthetic-users', type=int, default=0, help='scale the ratings up to this many users')
+    parser.add_argument('--queries', type=int, default=0, help='query the first N users only, 0 for all')
+    parser.add_argument('--tables', type=int, nargs='+', default=[16, 32, 64])
+    parser.add_argument('--bits', type=int, nargs='+', default=[0],
+                        help='hyperplanes per table, 0 to derive them from the user count')
+    parser.add_argument('--probes', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--max-candidates', type=int, nargs='+', default=[64, 256])
+    parser.add_argument('--components', type=int, nargs='+', default=[32, 64, 128],
+                        help='latent factors of the svd engine')
+    args = parser.parse_args()
+
+    X = build_user_item_matrix(pd.read_csv(args.ratings)).matrix
+    if args.synthetic_users:
+        X = synthetic_users(X, args.synthetic_users)
+    queries = X[:args.queries] if args.queries else X
+    print(f"{X.shape[0]} users x {X.shape[1]} items, {X.nnz} ratings, {queries.shape[0]} queries")
+
+    brute = make_neighbor_model('brute', n_neighbors=args.neighbors).fit(X)
+    start = time.perf_counter()
+    _, exact = brute.kneighbors(queries)
+    brute_s = time.perf_counter() - start
+    print(f"brute force: {brute_s:.3f}s")
+
+    print(f"{'tables':>6} {'bits':>4} {'probes':>6} {'max_cand':>8} {'recall@' + str(args.neighbors):>9} "
+          f"{'scanned':>8} {'fit_s':>6} {'query_s':>7} {'speedup':>7}")
+    for n_tables in args.tables:
+        for n_bits in args.bits:
+            for n_probes in args.probes:
+                for max_candidates in args.max_candidates:
+                    lsh = make_neighbor_model('lsh', n_neighbors=args.neighbors, n_tables=n_tables,
+                                              n_bits=n_bits or None, n_probes=n_probes,
+                                              max_candidates=max_candidates)
+                    start = time.perf_counter()
+                    lsh.fit(X)
+                    fit_s = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    _, approx = lsh.kneighbors(queries)
+                    query_s = time.perf_counter() - start
+
+                    # Share of users re-ranked per query: the work LSH does relative to brute force
+                    sample = queries[:lsh.chunk_size]
+                    query_rows, _ = lsh._candidates(sample)
+                    scanned = len(query_rows) / (sample.shape[0] * X.shape[0])
+                    print(f"{n_tables:>6} {lsh.n_bits_:>4} {n_probes:>6} {max_candidates:>8} "
+                          f"{neighbor_recall(exact, approx):>9.3f} {scanned:>8.1%} {fit_s:>6.3f} "
+                          f"{query_s:>7.3f} {brute_s / query_s:>6.2f}x")
+
+    print(f"\n{'components':>10} {'recall@' + str(args.neighbors):>9} {'fit_s':>6} {'query_s':>7}")
+    for n_components in args.components:
+        svd = make_neighbor_model('svd', n_neighbors=args.neighbors, n_components=n_components)
+        start = time.perf_counter()
+        svd.fit(X)
+        fit_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, approx = svd.kneighbors(queries)
+        query_s = time.perf_counter() - start
+        print(f"{n_components:>10} {neighbor_recall(exact, approx):>9.3f} {fit_s:>6.3f} {query_s:>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Offline speed and quality benchmark of the recommender engines on the bundled ma301 CSVs.
+
+No Snowflake session is needed. Ratings are split on TIMESTAMP: the oldest
+`--train-fraction` trains the model and each user's later ratings are the
+ground truth. For every engine it reports wall time and peak traced memory per
+stage (load, matrix build, fit, inference, write) plus precision@k / recall@k,
+and it times the vectorized path against the original per-movie loop:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --engines brute item -k 5 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+from output import iter_recommendation_frames  # noqa: E402
+from recommender import (  # noqa: E402
+    build_user_item_matrix, make_neighbor_model, recommend_movies_batch,
+    recommend_movies_batch_legacy, title_array,
+)
+
+
+def measure(results, engine, stage, fn, *args, **kwargs):
+    """Run fn, record its wall time and peak traced memory, and return its result"""
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    value = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    results.append({
+        'engine': engine, 'stage': stage, 'seconds': seconds,
+        'peak_mb': tracemalloc.get_traced_memory()[1] / 2 ** 20,
+    })
+    return value
+
+
+def load_csvs(ratings_path, titles_path, users_path):
+    return pd.read_csv(ratings_path), pd.read_csv(titles_path), pd.read_csv(users_path)
+
+
+def time_split(ratings, train_fraction):
+    """Oldest train_fraction of the ratings for training, the rest as ground truth"""
+    ordered = ratings.sort_values('TIMESTAMP', kind='stable')
+    cut = int(len(ordered) * train_fraction)
+    return ordered.iloc[:cut], ordered.iloc[cut:]
+
+
+def precision_recall(frames, test, min_rating, k):
+    """Mean precision@k and recall@k over test users with at least one relevant rating"""
+    recommended = pd.concat(frames, ignore_index=True)[['USER_ID', 'ITEM_ID']]
+    relevant = test[test['RATING'] >= min_rating][['USER_ID', 'ITEM_ID']].drop_duplicates()
+    hits = recommended.merge(relevant, on=['USER_ID', 'ITEM_ID']).groupby('USER_ID').size()
+    relevant_counts = relevant.groupby('USER_ID').size()
+    users = relevant_counts.index.intersection(recommended['USER_ID'].unique())
+    if len(users) == 0:
+        return 0.0, 0.0
+    user_hits = hits.reindex(users, fill_value=0)
+    return float((user_hits / k).mean()), float((user_hits / relevant_counts[users]).mean())
+
+
+def write_frames(frames, path):
+    for i, frame in enumerate(frames):
+        frame.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ratings', default=os.path.join(MODEL_DIR, 'ma301_user_ratings.csv'))
+    parser.add_argument('--titles', default=os.path.join(MODEL_DIR, 'ma301_titles.csv'))
+    parser.add_argument('--users', default=os.path.join(MODEL_DIR, 'ma301_user_id.csv'))
+    parser.add_argument('--engines', nargs='+', default=['brute', 'lsh', 'svd', 'item'])
+    parser.add_argument('--train-fraction', type=float, default=0.8)
+    parser.add_argument('--min-rating', type=float, default=4, help='test ratings counted as relevant')
+    parser.add_argument('-k', type=int, default=10, help='recommendations per user')
+    parser.add_argument('--neighbors', type=int, default=10)
+    parser.add_argument('--legacy-users', type=int, default=5,
+                        help='users timed on the original loop, 0 to skip it')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    stages = []
+    ratings, movie_titles, user_df = measure(stages, 'all', 'load', load_csvs, args.ratings, args.titles, args.users)
+    train, test = time_split(ratings, args.train_fraction)
+    user_item = measure(stages, 'all', 'matrix build', build_user_item_matrix, train)
+    titles = title_array(movie_titles, user_item.item_ids)
+    test_users = pd.DataFrame({'ID': np.intersect1d(test['USER_ID'].unique(), user_item.user_ids)})
+    print(f"train {len(train)} ratings / test {len(test)} ratings, {len(test_users)} test users, k={args.k}")
+
+    quality = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for engine in args.engines:
+            model = make_neighbor_model(engine, n_neighbors=args.neighbors)
+            measure(stages, engine, 'fit', model.fit, user_item.matrix)
+            frames = measure(stages, engine, 'inference', lambda: list(iter_recommendation_frames(
+                test_users, user_item, model, titles, n_neighbors=args.neighbors, n_recommendations=args.k
+            )))
+            measure(stages, engine, 'write', write_frames, frames, os.path.join(tmp, f'{engine}.csv'))
+            precision, recall = precision_recall(frames, test, args.min_rating, args.k)
+            quality.append({'engine': engine, f'precision@{args.k}': precision, f'recall@{args.k}': recall})
+
+    legacy = None
+    if args.legacy_users:
+        # The original loop needs the dense pivot and 1-based contiguous ids, so it runs on all ratings
+        sample = user_df.head(args.legacy_users)
+        pivot = ratings.pivot(index='USER_ID', columns='ITEM_ID', values='RATING').fillna(0)
+        full = build_user_item_matrix(ratings)
+        model = make_neighbor_model('brute', n_neighbors=args.neighbors).fit(full.matrix)
+        vectorized = measure(stages, 'vectorized', 'inference', recommend_movies_batch,
+                             sample, full, model, movie_titles)
+        looped = measure(stages, 'legacy loop', 'inference', recommend_movies_batch_legacy,
+                         sample, pivot, model, movie_titles)
+        legacy = {'users': len(sample), 'identical': bool(vectorized.equals(looped))}
+
+    tracemalloc.stop()
+
+    print(f"\n{'engine':<12} {'stage':<13} {'seconds':>8} {'peak_mb':>8}")
+    for row in stages:
+        print(f"{row['engine']:<12} {row['stage']:<13} {row['seconds']:>8.3f} {row['peak_mb']:>8.1f}")
+    print(f"\n{'engine':<12} {'precision@' + str(args.k):>13} {'recall@' + str(args.k):>10}")
+    for row in quality:
+        print(f"{row['engine']:<12} {row[f'precision@{args.k}']:>13.4f} {row[f'recall@{args.k}']:>10.4f}")
+    if legacy:
+        print(f"\nvectorized vs legacy loop on {legacy['users']} users: identical={legacy['identical']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'stages': stages, 'quality': quality, 'legacy': legacy}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Scaling of sharded batch inference with 1/2/4/8 worker processes on the bundled ma301 data.
+
+Saves an artifact to a temporary directory, scores every user (tiled `--repeat`
+times to make the batch larger) and checks each run matches the in-process result:
+
+    python benchmarks/shard_scaling.py
+    python benchmarks/shard_scaling.py --engine item --repeat 20 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+from artifact import save_artifact  # noqa: E402
+from recommender import build_user_item_matrix, make_neighbor_model, recommend_movies_batch  # noqa: E402
+from sharding import recommend_movies_sharded  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ratings', default=os.path.join(MODEL_DIR, 'ma301_user_ratings.csv'))
+    parser.add_argument('--titles', default=os.path.join(MODEL_DIR, 'ma301_titles.csv'))
+    parser.add_argument('--engine', default='brute', choices=['brute', 'lsh', 'svd', 'item'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    movie_titles = pd.read_csv(args.titles)
+    user_item = build_user_item_matrix(pd.read_csv(args.ratings))
+    model = make_neighbor_model(args.engine).fit(user_item.matrix)
+    user_df = pd.DataFrame({'ID': np.tile(user_item.user_ids, args.repeat)})
+    print(f"{len(user_df)} users to score, engine={args.engine}, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    expected = recommend_movies_batch(user_df, user_item, model, movie_titles)
+    print(f"in-process: {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'artifact')
+        save_artifact(path, user_item, model, movie_titles)
+
+        baseline = None
+        print(f"{'workers':>7} {'seconds':>8} {'speedup':>8} {'identical':>9}")
+        for n_workers in args.workers:
+            start = time.perf_counter()
+            results = recommend_movies_sharded(path, user_df, n_workers=n_workers)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f"{n_workers:>7} {seconds:>8.2f} {baseline / seconds:>7.2f}x {str(results.equals(expected)):>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Incremental refresh of the KNN movie recommender from new ratings.
+
+Only ratings from the matrix's TIMESTAMP high-water mark on are pulled, they
+are delta-merged into the ratings CSR, and only the users whose neighborhoods
+could have changed are scored again, found from the neighbor lists kept since
+the last scoring (NeighborLists, built from the neighbors scoring returns).
+"""
+import numpy as np
+import pandas as pd
+
+from recommender import _coo_to_user_item_matrix, kneighbors_chunked
+
+
+def new_ratings_since(ratings_table, high_water, timestamp_col='TIMESTAMP'):
+    """
+    Ratings at or after the high-water mark
+
+    Ratings sharing the high-water TIMESTAMP may not all have been loaded, so
+    that instant is pulled again; merge_ratings keeps the last rating of a
+    pair, which makes re-applying those rows harmless.
+
+    Parameters:
+    ratings_table (snowflake.snowpark.Table or pd.DataFrame): full ratings table
+    high_water: latest TIMESTAMP already in the matrix (UserItemMatrix.high_water)
+    timestamp_col (str): timestamp column name
+
+    Returns:
+    pd.DataFrame: the new ratings, oldest first
+    """
+    if isinstance(ratings_table, pd.DataFrame):
+        new_ratings = ratings_table[ratings_table[timestamp_col] >= high_water]
+    else:
+        # Filter in the warehouse so only the delta is transferred
+        from snowflake.snowpark.functions import col
+        new_ratings = ratings_table.filter(col(timestamp_col) >= high_water).to_pandas()
+    return new_ratings.sort_values(timestamp_col, kind='stable')
+
+
+def merge_ratings(user_item, new_ratings, user_col='USER_ID', item_col='ITEM_ID', rating_col='RATING',
+                  timestamp_col='TIMESTAMP'):
+    """
+    Delta-merge new ratings into the matrix; a new rating replaces an older one for the same pair
+
+    New users and items get rows / columns in id order, so the neighbor model
+    must be refitted on the merged matrix. The cost is linear in the stored
+    ratings plus the new ones, with no pivot or reload of the history.
+
+    Parameters:
+    user_item (UserItemMatrix): current ratings
+    new_ratings (pd.DataFrame): ratings to add, oldest first
+    user_col, item_col, rating_col, timestamp_col (str): column names in `new_ratings`
+
+    Returns:
+    tuple: (merged UserItemMatrix, USER_IDs whose ratings changed)
+    """
+    if len(new_ratings) == 0:
+        return user_item, user_item.user_ids[:0]
+
+    new_users = new_ratings[user_col].to_numpy()
+    new_items = new_ratings[item_col].to_numpy()
+    user_ids = np.union1d(user_item.user_ids, new_users)
+    item_ids = np.union1d(user_item.item_ids, new_items)
+
+    old = user_item.matrix.tocoo()
+    rows = np.concatenate([
+        np.searchsorted(user_ids, user_item.user_ids)[old.row],
+        np.searchsorted(user_ids, new_users)
+    ]).astype(np.int32)
+    columns = np.concatenate([
+        np.searchsorted(item_ids, user_item.item_ids)[old.col],
+        np.searchsorted(item_ids, new_items)
+    ]).astype(np.int32)
+    values = np.concatenate([old.data, new_ratings[rating_col].to_numpy().astype(old.data.dtype)])
+
+    high_water = user_item.high_water
+    if timestamp_col in new_ratings.columns:
+        latest = new_ratings[timestamp_col].max()
+        high_water = latest if high_water is None else max(high_water, latest)
+
+    merged = _coo_to_user_item_matrix(rows, columns, values, user_ids, item_ids, high_water)
+
+    # Ratings re-read at the high-water mark are already stored and change nothing
+    old_rows = user_item.rows_for(new_users)
+    old_columns = user_item.columns_for(new_items)
+    known = (old_rows >= 0) & (old_columns >= 0)
+    stored = np.zeros(len(new_users), dtype=old.data.dtype)
+    stored[known] = np.asarray(user_item.matrix[old_rows[known], old_columns[known]]).ravel()
+    changed = ~known | (stored != values[old.nnz:])
+    return merged, np.unique(new_users[changed])
+
+
+class NeighborLists:
+    """
+    Every user's neighbors as of the last scoring, kept between refreshes
+
+    Attributes:
+    user_ids (np.ndarray): USER_ID of each row, sorted like UserItemMatrix.user_ids
+    neighbor_ids (np.ndarray): (users x k) USER_IDs of each user's neighbors, nearest first
+    kth_similarity (np.ndarray): cosine similarity of each user's k-th neighbor, -inf if unknown
+    """
+
+    def __init__(self, user_ids, neighbor_ids, kth_similarity):
+        self.user_ids = user_ids
+        self.neighbor_ids = neighbor_ids
+        self.kth_similarity = kth_similarity
+
+
+def neighbor_lists(user_item, model_knn, n_neighbors=10, user_ids=None, previous=None, chunk_size=1024):
+    """
+    Query the neighbors of `user_ids` (all users by default), keeping the other users' lists from `previous`
+
+    Scoring already finds these neighbors: prefer the ones returned by
+    recommender.precompute_top_n(return_neighbors=True) with scored_neighbor_lists.
+
+    Parameters:
+    user_item (UserItemMatrix): ratings model_knn was fitted on
+    model_knn (NearestNeighbors or RandomProjectionLSH): fitted cosine neighbor model
+    n_neighbors (int): neighbors per user, as used for scoring
+    user_ids (np.ndarray): USER_IDs to query, e.g. those returned by affected_user_ids
+    previous (NeighborLists): lists from before the refresh, for the users not queried
+    chunk_size (int): users per kneighbors call
+
+    Returns:
+    NeighborLists: aligned with user_item.user_ids
+    """
+    rows = np.arange(user_item.shape[0]) if user_ids is None else user_item.rows_for(np.asarray(user_ids))
+    rows = rows[rows >= 0]
+    blocks = list(kneighbors_chunked(model_knn, user_item.matrix[rows], n_neighbors, chunk_size))
+    distances = np.concatenate([block[1] for block in blocks]) if blocks else np.empty((0, n_neighbors))
+    indices = np.concatenate([block[2] for block in blocks]) if blocks else np.empty((0, n_neighbors), dtype=int)
+    return scored_neighbor_lists(user_item, (rows, distances, indices), previous)
+
+
+def scored_neighbor_lists(user_item, scored, previous=None):
+    """
+    NeighborLists from the neighbors found while scoring, keeping the other users' lists from `previous`
+
+    Parameters:
+    user_item (UserItemMatrix): ratings the model was fitted on
+    scored (tuple): (rows, distances, indices) from recommender.precompute_top_n(return_neighbors=True)
+    previous (NeighborLists): lists from before the refresh, for the users not scored
+
+    Returns:
+    NeighborLists: aligned with user_item.user_ids
+    """
+    rows, distances, indices = scored
+    n_users = user_item.shape[0]
+    neighbor_ids = np.zeros((n_users, indices.shape[1]), dtype=user_item.user_ids.dtype)
+    kth_similarity = np.full(n_users, -np.inf)
+    if previous is not None:
+        previous_rows = user_item.rows_for(previous.user_ids)
+        neighbor_ids[previous_rows] = previous.neighbor_ids
+        kth_similarity[previous_rows] = previous.kth_similarity
+
+    neighbor_ids[rows] = user_item.user_ids[indices]
+    kth_similarity[rows] = 1 - distances[:, -1]
+    return NeighborLists(user_item.user_ids, neighbor_ids, kth_similarity)
+
+
+def carry_top_n(previous_user_item, user_item, columns, scores):
+    """
+    Precomputed top-N arrays (see recommender.precompute_top_n) moved to the rows and columns of a merged matrix
+
+    Users new to the merged matrix get -1 / -inf, as if not computed.
+
+    Parameters:
+    previous_user_item (UserItemMatrix): matrix the arrays were computed on
+    user_item (UserItemMatrix): merged matrix, from merge_ratings
+    columns, scores (np.ndarray): (users x N) top-N of previous_user_item
+
+    Returns:
+    tuple: (columns, scores) aligned with user_item
+    """
+    merged_columns = np.full((user_item.shape[0], columns.shape[1]), -1, dtype=columns.dtype)
+    merged_scores = np.full((user_item.shape[0], scores.shape[1]), -np.inf, dtype=scores.dtype)
+    rows = user_item.rows_for(previous_user_item.user_ids)
+    # The trailing -1 maps the -1 padding of `columns` to itself
+    column_map = np.append(user_item.columns_for(previous_user_item.item_ids), -1).astype(columns.dtype)
+    merged_columns[rows] = column_map[columns]
+    merged_scores[rows] = scores
+    return merged_columns, merged_scores
+
+
+def affected_user_ids(user_item, changed_user_ids, neighbors):
+    """
+    Users whose neighbors or scores could have changed, for the exact cosine ('brute') engine
+
+    Similarities between two unchanged users stay the same, so an unchanged
+    user's neighbor list only moves when a changed user leaves it or enters it.
+    The result is the changed users, the users whose stored list holds a
+    changed user, and the users a changed user is now at least as close to as
+    their k-th neighbor. The last set takes one product of the changed rows
+    against the whole matrix, so the cost follows the new ratings rather than
+    the number of users.
+
+    Parameters:
+    user_item (UserItemMatrix): merged ratings
+    changed_user_ids (np.ndarray): USER_IDs returned by merge_ratings
+    neighbors (NeighborLists): lists from before the merge (see neighbor_lists)
+
+    Returns:
+    np.ndarray: sorted USER_IDs to score again
+    """
+    rows = user_item.rows_for(changed_user_ids)
+    rows = rows[rows >= 0]
+    affected = np.zeros(user_item.shape[0], dtype=bool)
+    affected[rows] = True
+
+    # Users that were not queried before (e.g. new ones) have an unknown k-th similarity
+    previous_rows = user_item.rows_for(neighbors.user_ids)
+    kth_similarity = np.full(user_item.shape[0], -np.inf)
+    kth_similarity[previous_rows] = neighbors.kth_similarity
+    affected[previous_rows[np.isin(neighbors.neighbor_ids, changed_user_ids).any(axis=1)]] = True
+
+    X = user_item.matrix
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    overlaps = (X[rows] @ X.T).tocoo()
+    best = np.full(user_item.shape[0], -np.inf)
+    np.maximum.at(best, overlaps.col, overlaps.data / (norms[rows][overlaps.row] * norms[overlaps.col]))
+    affected |= best >= kth_similarity
+    return user_item.user_ids[np.flatnonzero(affected)]
+
+
+def affected_user_ids_item_item(user_item, changed_user_ids, model, previous_item_ids, previous_model):
+    """
+    Users to score again for the 'item' engine: changed users and raters of items whose neighbor list moved
+
+    Parameters:
+    user_item (UserItemMatrix): merged ratings
+    changed_user_ids (np.ndarray): USER_IDs returned by merge_ratings
+    model (ItemNeighbors): model refitted on the merged ratings
+    previous_item_ids (np.ndarray): item_ids of the matrix `previous_model` was fitted on
+    previous_model (ItemNeighbors): model before the refresh
+
+    Returns:
+    np.ndarray: sorted USER_IDs to score again
+    """
+    changed_items = np.ones(user_item.shape[1], dtype=bool)
+    if previous_model.neighbors_.shape[1] == model.neighbors_.shape[1]:
+        # Express the old lists in the merged matrix's columns before comparing
+        old_columns = user_item.columns_for(previous_item_ids)
+        same = (
+            (model.neighbors_[old_columns] == old_columns[previous_model.neighbors_]).all(axis=1)
+            & np.isclose(model.similarities_[old_columns], previous_model.similarities_).all(axis=1)
+        )
+        changed_items[old_columns[same]] = False
+
+    rows = user_item.rows_for(changed_user_ids)
+    raters = user_item.matrix.tocsc()[:, np.flatnonzero(changed_items)].indices
+    return user_item.user_ids[np.union1d(rows[rows >= 0], raters)]
@@ -0,0 +1,84 @@
+"""
+Item-based collaborative filtering for the KNN movie recommender.
+
+The top-k most similar items of every ITEM_ID are computed once from the
+ratings CSR and kept as two compact (items x k) arrays. Scoring a user is then
+a sparse gather over the items they rated, with no search across users.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class ItemNeighbors:
+    """
+    Precomputed top-k cosine neighbors of every item
+
+    A user's score for item j is the sum, over the items i they rated, of
+    rating(i) * similarity(i, j) for every j among the k neighbors of i.
+
+    Parameters:
+    n_neighbors (int): neighbors kept per item (k)
+    chunk_size (int): items per similarity block while fitting
+
+    Attributes:
+    neighbors_ (np.ndarray): int32 (items x k) neighbor columns, most similar first
+    similarities_ (np.ndarray): float32 (items x k) cosine similarities
+    weights_ (csr_matrix): the same lists as a sparse (items x items) matrix
+    """
+
+    def __init__(self, n_neighbors=10, chunk_size=1024):
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+
+    def fit(self, X):
+        """
+        Compute the top-k neighbor lists of every item (column) of X
+
+        Only one (chunk_size x items) similarity block is dense at a time.
+
+        Parameters:
+        X (csr_matrix): users x items ratings
+
+        Returns:
+        ItemNeighbors: self
+        """
+        items = csr_matrix(X.T, dtype=np.float32)
+        norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        items.data /= np.repeat(norms, np.diff(items.indptr)).astype(np.float32)
+
+        n_items = items.shape[0]
+        k = min(self.n_neighbors, n_items - 1)
+        self.neighbors_ = np.empty((n_items, k), dtype=np.int32)
+        self.similarities_ = np.empty((n_items, k), dtype=np.float32)
+        for start in range(0, n_items, self.chunk_size):
+            block = (items[start:start + self.chunk_size] @ items.T).toarray()
+            rows = np.arange(len(block))
+            block[rows, rows + start] = -np.inf
+
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_similarities = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_similarities, axis=1, kind='stable')
+            self.neighbors_[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+            self.similarities_[start:start + len(block)] = np.take_along_axis(top_similarities, order, axis=1)
+
+        self.weights_ = self.weights()
+        return self
+
+    def weights(self):
+        """Neighbor lists as a sparse (items x items) similarity matrix"""
+        n_items, k = self.neighbors_.shape
+        indptr = np.arange(0, n_items * k + 1, k)
+        return csr_matrix((self.similarities_.ravel(), self.neighbors_.ravel(), indptr), shape=(n_items, n_items))
+
+    def score(self, user_ratings):
+        """
+        Score every item for a block of users from the items they rated
+
+        Parameters:
+        user_ratings (csr_matrix): the users' rows of the ratings matrix
+
+        Returns:
+        np.ndarray: dense (users x items) scores, already rated items not masked
+        """
+        return (user_ratings @ self.weights_).toarray().astype(np.float64)
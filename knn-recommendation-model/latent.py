@@ -0,0 +1,94 @@
+"""
+Latent-factor neighbor search for the KNN movie recommender.
+
+A randomized truncated SVD of the ratings CSR, fitted once, maps every user to
+a short dense float32 vector. Neighbors are searched among those vectors
+instead of the sparse rows over the whole catalog, so the cost per query
+depends on the number of factors rather than on the number of items. Scoring
+still sums the neighbors' actual ratings, as with the other user-based engines.
+"""
+import numpy as np
+from sklearn.utils.extmath import randomized_svd
+
+from ann_index import _top_k
+
+
+class LatentNeighbors:
+    """
+    Cosine nearest neighbors in a truncated-SVD factor space
+
+    Exposes the same fit / kneighbors interface as NearestNeighbors.
+
+    Parameters:
+    n_neighbors (int): default neighbors returned by kneighbors
+    n_components (int): latent factors kept, 32-128 is a good range
+    n_iter (int): power iterations of the randomized SVD
+    chunk_size (int): queries per similarity block in kneighbors
+    random_state (int): seed for the randomized SVD
+
+    Attributes:
+    components_ (np.ndarray): float32 (n_components x items) item factors, projects ratings rows
+    embeddings_ (np.ndarray): float32 (users x n_components) unit-length user factors
+    """
+
+    def __init__(self, n_neighbors=10, n_components=64, n_iter=5, chunk_size=1024, random_state=0):
+        self.n_neighbors = n_neighbors
+        self.n_components = n_components
+        self.n_iter = n_iter
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def fit(self, X):
+        """
+        Factorize X and keep the normalized user factors
+
+        Parameters:
+        X (csr_matrix): users x items ratings
+
+        Returns:
+        LatentNeighbors: self
+        """
+        n_components = min(self.n_components, min(X.shape) - 1)
+        U, sigma, VT = randomized_svd(X.astype(np.float32), n_components, n_iter=self.n_iter,
+                                      random_state=self.random_state)
+        self.components_ = VT.astype(np.float32)
+        self.embeddings_ = _normalize(U * sigma)
+        return self
+
+    def transform(self, X):
+        """Unit-length latent vectors of ratings rows, in the space of embeddings_"""
+        return _normalize(np.asarray(X @ self.components_.T))
+
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """
+        Cosine neighbors of every row of X among the fitted users, in the latent space
+
+        Parameters:
+        X (csr_matrix): query rows of ratings
+        n_neighbors (int): neighbors per row, defaults to the constructor value
+        return_distance (bool): also return the cosine distances
+
+        Returns:
+        tuple: (distances, indices) of shape (queries, n_neighbors), or only indices
+        """
+        n_neighbors = n_neighbors or self.n_neighbors
+        queries = self.transform(X)
+        indices = np.empty((queries.shape[0], n_neighbors), dtype=np.int64)
+        distances = np.empty((queries.shape[0], n_neighbors), dtype=np.float64)
+        for start in range(0, queries.shape[0], self.chunk_size):
+            similarities = queries[start:start + self.chunk_size] @ self.embeddings_.T
+            # The k most similar, ties at the k-th going to the lowest rows
+            top, top_similarities = _top_k(similarities, n_neighbors)
+            indices[start:start + len(top)] = top
+            distances[start:start + len(top)] = 1 - top_similarities
+
+        if return_distance:
+            return distances, indices
+        return indices
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
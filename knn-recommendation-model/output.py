@@ -0,0 +1,104 @@
+"""
+Flat, typed recommendation output for the KNN movie recommender.
+
+One row per (user, rank) instead of a VARIANT list of stringified scores, so
+consumers filter on RANK instead of FLATTEN + PARSE_JSON + TRY_TO_NUMBER. Rows
+are produced one scoring block at a time and written in bounded batches of
+blocks; the full result never sits in a single DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+from recommender import iter_top_n, resolve_titles
+
+FLAT_TABLE_DDL = """CREATE OR REPLACE TABLE {table} (
+    USER_ID INT,
+    RANK SMALLINT,
+    ITEM_ID INT,
+    TITLE VARCHAR,
+    SCORE FLOAT
+)"""
+
+
+def iter_recommendation_frames(user_ids_df, user_item, model_knn, movie_titles,
+                               n_neighbors=10, n_recommendations=3, chunk_size=1024):
+    """
+    Recommendations as long-format DataFrames, one per scoring block
+
+    Parameters:
+    user_ids_df (pd.DataFrame): DataFrame containing user_ids in an 'ID' column
+    user_item (UserItemMatrix): ratings the model was fitted on
+    model_knn (NearestNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors): fitted model
+    movie_titles (pd.DataFrame or np.ndarray): ITEM_ID / TITLE lookup, or the title_array of user_item
+    n_neighbors (int): neighbors used to score each user
+    n_recommendations (int): movies recommended per user
+    chunk_size (int): users per block, bounds the rows of each frame
+
+    Yields:
+    pd.DataFrame: USER_ID, RANK, ITEM_ID, TITLE, SCORE with at most chunk_size x n_recommendations rows
+    """
+    user_ids = np.asarray(user_ids_df['ID'].values)
+    user_rows = user_item.rows_for(user_ids)
+    valid = user_rows >= 0
+    if not valid.all():
+        print(f"Skipping {np.count_nonzero(~valid)} user_ids with no row in the ratings matrix")
+    valid_ids = user_ids[valid]
+    titles = resolve_titles(movie_titles, user_item)
+    ranks = np.arange(1, n_recommendations + 1, dtype=np.int16)
+
+    batches = iter_top_n(user_item, model_knn, user_rows[valid], n_neighbors, n_recommendations, chunk_size)
+    for start, columns, scores in batches:
+        # Users with fewer unrated movies than n_recommendations have -inf padding
+        found = np.isfinite(scores)
+        columns = columns[found]
+        yield pd.DataFrame({
+            'USER_ID': np.repeat(valid_ids[start:start + len(found)], found.sum(axis=1)),
+            'RANK': np.broadcast_to(ranks[:found.shape[1]], found.shape)[found],
+            'ITEM_ID': user_item.item_ids[columns],
+            'TITLE': titles[columns],
+            'SCORE': scores[found],
+        })
+
+
+def write_recommendations(session, frames, table_name='MOVIE_RECOMMENDATIONS_FLAT', mode='overwrite',
+                          max_rows=500_000):
+    """
+    Create the typed table and append the frames to it as they are produced
+
+    Frames are buffered up to max_rows rows per write_pandas call, so the
+    number of uploads (a PUT and a COPY each) follows the row count rather
+    than the scoring block size, while memory stays bounded by max_rows plus
+    one block.
+
+    Parameters:
+    session (snowflake.snowpark.Session): Snowpark session
+    frames (iterable of pd.DataFrame): frames from iter_recommendation_frames
+    table_name (str): target table
+    mode (str): 'overwrite' replaces the table, 'append' adds to the existing one (e.g. re-scored users)
+    max_rows (int): rows buffered before each write_pandas call
+
+    Returns:
+    int: rows written
+    """
+    if mode == 'overwrite':
+        session.sql(FLAT_TABLE_DDL.format(table=table_name)).collect()
+    elif mode != 'append':
+        raise ValueError(f"Unknown mode {mode!r}, expected 'overwrite' or 'append'")
+
+    def flush(buffer):
+        session.write_pandas(pd.concat(buffer, ignore_index=True), table_name,
+                             auto_create_table=False, quote_identifiers=False)
+
+    rows = 0
+    buffer, buffered = [], 0
+    for frame in frames:
+        if len(frame):
+            buffer.append(frame)
+            buffered += len(frame)
+            rows += len(frame)
+        if buffered >= max_rows:
+            flush(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        flush(buffer)
+    return rows
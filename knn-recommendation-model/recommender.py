@@ -0,0 +1,616 @@
+"""
+Batch inference helpers for the KNN movie recommender.
+
+Upload this file to the notebook's stage next to RECOMMENDER_NOTEBOOK.ipynb so
+the notebook can `import recommender`.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from ann_index import ExactCosineNeighbors, RandomProjectionLSH, _top_k
+from item_item import ItemNeighbors
+from latent import LatentNeighbors
+
+
+class UserItemMatrix:
+    """
+    Compact users x items ratings matrix with its USER_ID / ITEM_ID maps
+
+    Attributes:
+    matrix (csr_matrix): ratings, int32 indices and narrow values
+    user_ids (np.ndarray): sorted USER_ID of each row, also the user_id -> row lookup
+    item_ids (np.ndarray): sorted ITEM_ID of each column, also the item_id -> column lookup
+    high_water: latest TIMESTAMP included in the matrix, None if unknown
+    """
+
+    def __init__(self, matrix, user_ids, item_ids, high_water=None):
+        self.matrix = matrix
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.high_water = high_water
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def rows_for(self, user_ids):
+        """Row of each USER_ID in the matrix, -1 for ids without ratings"""
+        return _lookup(self.user_ids, user_ids)
+
+    def columns_for(self, item_ids):
+        """Column of each ITEM_ID in the matrix, -1 for ids without ratings"""
+        return _lookup(self.item_ids, item_ids)
+
+
+def _lookup(sorted_ids, ids):
+    ids = np.asarray(ids)
+    if len(sorted_ids) == 0:
+        return np.full(ids.shape, -1, dtype=np.int32)
+    positions = np.searchsorted(sorted_ids, ids).clip(0, len(sorted_ids) - 1)
+    return np.where(sorted_ids[positions] == ids, positions, -1).astype(np.int32)
+
+
+def build_user_item_matrix(ratings, user_col='USER_ID', item_col='ITEM_ID', rating_col='RATING',
+                           timestamp_col='TIMESTAMP', dtype=np.float32):
+    """
+    Build the ratings CSR straight from the (user, item, rating) columns
+
+    Unlike `ratings.pivot(...).fillna(0)` nothing of size users x items is
+    allocated, and ids do not need to be dense, contiguous or 1-based. If a
+    user rated the same item more than once the last rating wins.
+
+    Parameters:
+    ratings (pd.DataFrame): one row per rating
+    user_col, item_col, rating_col (str): column names in `ratings`
+    timestamp_col (str): column whose maximum becomes the high-water mark, if present
+    dtype (np.dtype): value dtype of the matrix, float32 or uint8
+
+    Returns:
+    UserItemMatrix: the CSR matrix with its id maps
+    """
+    user_ids, rows = np.unique(ratings[user_col].to_numpy(), return_inverse=True)
+    item_ids, columns = np.unique(ratings[item_col].to_numpy(), return_inverse=True)
+    high_water = ratings[timestamp_col].max() if timestamp_col in ratings.columns else None
+    return _coo_to_user_item_matrix(
+        rows.astype(np.int32), columns.astype(np.int32),
+        ratings[rating_col].to_numpy().astype(dtype), user_ids, item_ids, high_water
+    )
+
+
+def load_user_item_matrix(source, user_col='USER_ID', item_col='ITEM_ID', rating_col='RATING',
+                          timestamp_col='TIMESTAMP', dtype=np.float32, batch_size=100_000):
+    """
+    Build the ratings CSR from a table or CSV streamed in batches, without one full DataFrame
+
+    Each batch is reduced to int32 row / column codes and `dtype` ratings
+    before the next one is read; USER_ID / ITEM_ID keep their own dtype, so
+    BIGINT ids work. The batches are placed straight into the CSR, so peak
+    memory is about 20 bytes per rating (the reduced batches plus the matrix)
+    plus one batch. The result is the same as build_user_item_matrix(whole table).
+
+    Parameters:
+    source (snowflake.snowpark.Table or str): ratings table, or path of a local ratings CSV
+    user_col, item_col, rating_col (str): column names in `source`
+    timestamp_col (str): column whose maximum becomes the high-water mark, if present
+    dtype (np.dtype): value dtype of the matrix, float32 or uint8
+    batch_size (int): rows per CSV chunk; a Snowpark table is read in its own result batches
+
+    Returns:
+    UserItemMatrix: the CSR matrix with its id maps
+    """
+    users, items = _IdCodes(), _IdCodes()
+    batches = []
+    high_water = None
+    for batch in iter_rating_batches(source, [user_col, item_col, rating_col, timestamp_col], batch_size):
+        batches.append((
+            users.codes(batch[user_col].to_numpy()),
+            items.codes(batch[item_col].to_numpy()),
+            batch[rating_col].to_numpy().astype(dtype),
+        ))
+        if timestamp_col in batch.columns and len(batch):
+            latest = batch[timestamp_col].max()
+            high_water = latest if high_water is None else max(high_water, latest)
+
+    # Codes were handed out in first-seen order, renumber them in id order in place
+    user_ids, user_rows = users.sorted()
+    item_ids, item_columns = items.sorted()
+    for rows, columns, _ in batches:
+        np.take(user_rows, rows, out=rows)
+        np.take(item_columns, columns, out=columns)
+    matrix = _csr_keep_last(batches, (len(user_ids), len(item_ids)), dtype)
+    return UserItemMatrix(matrix, user_ids, item_ids, high_water)
+
+
+def iter_rating_batches(source, columns, batch_size=100_000):
+    """
+    Rating rows as a stream of pandas DataFrames, with only the columns the matrix needs
+
+    Parameters:
+    source (snowflake.snowpark.Table or str): ratings table, or path of a local ratings CSV
+    columns (list): wanted columns, those missing from `source` are skipped
+    batch_size (int): rows per CSV chunk
+
+    Yields:
+    pd.DataFrame: one batch of ratings
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield from pd.read_csv(source, usecols=lambda name: name in columns, chunksize=batch_size)
+    else:
+        yield from source.select(*[name for name in columns if name in source.columns]).to_pandas_batches()
+
+
+class _IdCodes:
+    """
+    int32 code of every id seen so far, handed out in first-seen order
+
+    The seen ids are kept sorted in two runs: a large one and a run of recent
+    ids, merged into the large one once it reaches an eighth of its size. A
+    batch with new ids only rewrites the recent run, so coding a table costs
+    a few full merges rather than one per batch.
+    """
+
+    def __init__(self):
+        self.main = None
+        self.recent = None
+        self.n_codes = 0
+
+    def codes(self, ids):
+        unique, inverse = np.unique(ids, return_inverse=True)
+        if self.main is None:
+            self.main = self.recent = (unique[:0], np.empty(0, dtype=np.int32))
+        unique_codes = np.full(len(unique), -1, dtype=np.int32)
+        for run_ids, run_codes in (self.main, self.recent):
+            positions = _lookup(run_ids, unique)
+            found = positions >= 0
+            unique_codes[found] = run_codes[positions[found]]
+
+        new = unique_codes < 0
+        if new.any():
+            unique_codes[new] = np.arange(self.n_codes, self.n_codes + np.count_nonzero(new), dtype=np.int32)
+            self.n_codes += np.count_nonzero(new)
+            self.recent = _merge_sorted(self.recent, (unique[new], unique_codes[new]))
+            if len(self.recent[0]) * 8 > len(self.main[0]):
+                self.main = _merge_sorted(self.main, self.recent)
+                self.recent = (unique[:0], np.empty(0, dtype=np.int32))
+        return unique_codes[inverse.reshape(-1)]
+
+    def sorted(self):
+        """Sorted ids, and the position in them of every code"""
+        if self.main is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        ids, id_codes = _merge_sorted(self.main, self.recent)
+        positions = np.empty(len(id_codes), dtype=np.int32)
+        positions[id_codes] = np.arange(len(id_codes), dtype=np.int32)
+        return ids, positions
+
+
+def _merge_sorted(run, other):
+    """Merge two (sorted ids, codes) runs with no id in common"""
+    positions = np.searchsorted(run[0], other[0])
+    return np.insert(run[0], positions, other[0]), np.insert(run[1], positions, other[1])
+
+
+def _coo_to_user_item_matrix(rows, columns, values, user_ids, item_ids, high_water=None):
+    chunks = [(rows[start:start + _CHUNK], columns[start:start + _CHUNK], values[start:start + _CHUNK])
+              for start in range(0, len(rows), _CHUNK)]
+    matrix = _csr_keep_last(chunks, (len(user_ids), len(item_ids)), values.dtype)
+    return UserItemMatrix(matrix, user_ids, item_ids, high_water)
+
+
+# Ratings per step of the CSR build, bounds its int64 scratch arrays
+_CHUNK = 100_000
+
+
+def _csr_keep_last(chunks, shape, dtype):
+    """
+    CSR with int32 indices from (rows, columns, values) chunks in rating order
+
+    A stable counting sort places every chunk in its rows, then each block of
+    rows is sorted by column and keeps the last rating of any duplicated
+    (user, item) pair, as the pivot would have failed on them.
+    """
+    n_rows, n_columns = shape
+    counts = np.zeros(n_rows, dtype=np.int64)
+    for rows, _, _ in chunks:
+        present, row_counts = np.unique(rows, return_counts=True)
+        counts[present] += row_counts
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    data = np.empty(indptr[-1], dtype=dtype)
+
+    # Next free slot of every row; chunks are placed in order, so later ratings land after earlier ones
+    fill = indptr[:-1].copy()
+    for rows, columns, values in chunks:
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        present, starts, row_counts = np.unique(sorted_rows, return_index=True, return_counts=True)
+        slots = fill[sorted_rows] + np.arange(len(rows)) - np.repeat(starts, row_counts)
+        indices[slots] = columns[order]
+        data[slots] = values[order]
+        fill[present] += row_counts
+
+    # Compact in place block by block; the write position never passes the read position
+    new_indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    written = 0
+    row = 0
+    while row < n_rows:
+        end = min(max(int(np.searchsorted(indptr, indptr[row] + _CHUNK, side='right')) - 1, row + 1), n_rows)
+        lo, hi = indptr[row], indptr[end]
+        local_rows = np.repeat(np.arange(end - row, dtype=np.int64), np.diff(indptr[row:end + 1]))
+        keys = local_rows * n_columns + indices[lo:hi]
+        order = np.argsort(keys, kind='stable')
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = keys[order[:-1]] != keys[order[1:]]
+        kept = order[last]
+        indices[written:written + len(kept)] = indices[lo:hi][kept]
+        data[written:written + len(kept)] = data[lo:hi][kept]
+        new_indptr[row + 1:end + 1] = written + np.cumsum(np.bincount(local_rows[kept], minlength=end - row))
+        written += len(kept)
+        row = end
+
+    # Views, not copies: a second matrix would double the peak for the few duplicated slots.
+    # indptr stays int64 past 2**31 - 1 ratings (scipy then widens the indices as well).
+    if written <= np.iinfo(np.int32).max:
+        new_indptr = new_indptr.astype(np.int32)
+    matrix = csr_matrix((data[:written], indices[:written], new_indptr), shape=shape, copy=False)
+    matrix.has_sorted_indices = True
+    return matrix
+
+
+def title_array(movie_titles, item_ids):
+    """
+    TITLE of every item column, resolved once with a vectorized id lookup
+
+    Build it once after loading the matrix; recommendations then index it by
+    column instead of filtering the titles DataFrame per recommended movie.
+
+    Parameters:
+    movie_titles (pd.DataFrame): ITEM_ID / TITLE lookup
+    item_ids (np.ndarray): sorted ITEM_ID of each column
+
+    Returns:
+    np.ndarray: fixed-width unicode titles, '' for items without a title
+    """
+    titles = movie_titles.drop_duplicates('ITEM_ID', keep='last').set_index('ITEM_ID')['TITLE']
+    return titles.reindex(item_ids).fillna('').to_numpy().astype(str)
+
+
+def resolve_titles(movie_titles, user_item):
+    """Title array of the matrix columns, from a titles DataFrame or an already built title_array"""
+    if isinstance(movie_titles, pd.DataFrame):
+        return title_array(movie_titles, user_item.item_ids)
+    return np.asarray(movie_titles)
+
+
+def make_neighbor_model(engine='brute', n_neighbors=10, **params):
+    """
+    Create an unfitted neighbor model, all fitted with model.fit(ratings)
+
+    The user-based engines share the kneighbors interface; 'item' scores users
+    from precomputed item neighbor lists instead (see item_item.py).
+
+    Parameters:
+    engine (str): 'brute' for exact cosine KNN, 'lsh' for the random-projection LSH
+        index, 'svd' for exact cosine KNN on truncated-SVD factors, 'item' for
+        item-item collaborative filtering
+    n_neighbors (int): default neighbors per query user, or per item for 'item'
+    params: engine specific settings, e.g. n_tables / n_bits / n_probes for 'lsh',
+        n_components for 'svd'
+
+    Returns:
+    ExactCosineNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors
+    """
+    if engine == 'brute':
+        # NearestNeighbors(metric='cosine', algorithm='brute') with deterministic ties, and loadable from an artifact
+        return ExactCosineNeighbors(n_neighbors=n_neighbors, **params)
+    if engine == 'lsh':
+        return RandomProjectionLSH(n_neighbors=n_neighbors, **params)
+    if engine == 'svd':
+        return LatentNeighbors(n_neighbors=n_neighbors, **params)
+    if engine == 'item':
+        return ItemNeighbors(n_neighbors=n_neighbors, **params)
+    raise ValueError(f"Unknown neighbor engine '{engine}'")
+
+
+def neighbor_indicator(indices, n_users):
+    """
+    Build a sparse 0/1 matrix with one row per query user and a 1 for each of its neighbors
+
+    Parameters:
+    indices (np.ndarray): neighbor rows as returned by kneighbors, shape (queries, k)
+    n_users (int): number of rows in the fitted ratings matrix
+
+    Returns:
+    csr_matrix: (queries x n_users) neighbor indicator matrix
+    """
+    n_queries, k = indices.shape
+    indptr = np.arange(0, n_queries * k + 1, k)
+    data = np.ones(n_queries * k, dtype=np.float32)
+    return csr_matrix((data, indices.ravel(), indptr), shape=(n_queries, n_users))
+
+
+def score_neighbors(ratings, user_rows, neighbor_indices):
+    """
+    Sum the neighbors' ratings of every item, for all query users at once
+
+    Parameters:
+    ratings (csr_matrix): users x items ratings matrix the model was fitted on
+    user_rows (np.ndarray): row of each query user in `ratings`
+    neighbor_indices (np.ndarray): kneighbors indices, one row per query user
+
+    Returns:
+    np.ndarray: dense (queries x items) scores; items the user already rated are -inf
+    """
+    indicator = neighbor_indicator(neighbor_indices, ratings.shape[0])
+    scores = (indicator @ ratings).toarray().astype(np.float64)
+    return mask_seen(scores, ratings[user_rows])
+
+
+def mask_seen(scores, user_ratings):
+    """
+    Set the score of every item a user already rated to -inf, in place
+
+    Parameters:
+    scores (np.ndarray): dense (queries x items) scores
+    user_ratings (csr_matrix): the query users' rows of the ratings matrix
+
+    Returns:
+    np.ndarray: scores
+    """
+    # Mask already rated items straight from the sparse structure of the user rows
+    seen_rows = np.repeat(np.arange(user_ratings.shape[0]), np.diff(user_ratings.indptr))
+    scores[seen_rows, user_ratings.indices] = -np.inf
+    return scores
+
+
+def top_n(scores, n):
+    """
+    Pick the n best items per row, ties going to the lowest column like the original loop
+
+    np.argpartition finds each row's n best items in linear time, so the cost
+    does not grow with n the way a full sort of the catalog would. Only the n
+    selected items are sorted.
+
+    Parameters:
+    scores (np.ndarray): dense (queries x items) scores
+    n (int): number of items to keep per row
+
+    Returns:
+    tuple: (columns, scores) arrays, both of shape (queries, n)
+    """
+    return _top_k(scores, n)
+
+
+def kneighbors_chunked(model_knn, X, n_neighbors=10, chunk_size=1024):
+    """
+    Query neighbors for every row of X with one kneighbors call per block of rows
+
+    Only one (chunk_size x fitted users) distance block is alive at a time, so
+    memory stays bounded however many users are queried.
+
+    Parameters:
+    model_knn (NearestNeighbors): fitted neighbor model
+    X (csr_matrix): query rows
+    n_neighbors (int): neighbors per row
+    chunk_size (int): rows per kneighbors call
+
+    Yields:
+    tuple: (start, distances, indices) with the neighbors of X[start:start + len(indices)]
+    """
+    for start in range(0, X.shape[0], chunk_size):
+        distances, indices = model_knn.kneighbors(X[start:start + chunk_size], n_neighbors=n_neighbors)
+        yield start, distances, indices
+
+
+def iter_top_n(user_item, model_knn, user_rows, n_neighbors=10, n_recommendations=3, chunk_size=1024,
+               return_neighbors=False):
+    """
+    Score users block by block, feeding each kneighbors block straight into scoring
+
+    An ItemNeighbors model skips the neighbor search and scores each block
+    from the items its users rated.
+
+    Parameters:
+    user_item (UserItemMatrix): ratings the model was fitted on
+    model_knn (NearestNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors): fitted model
+    user_rows (np.ndarray): matrix rows of the users to score
+    n_neighbors (int): neighbors used to score each user
+    n_recommendations (int): items kept per user
+    chunk_size (int): users per kneighbors call and scoring block
+    return_neighbors (bool): also yield the block's kneighbors distances and indices (not for ItemNeighbors)
+
+    Yields:
+    tuple: (start, columns, scores) for user_rows[start:start + len(columns)],
+        followed by (distances, indices) with return_neighbors
+    """
+    ratings = user_item.matrix
+    queries = ratings[user_rows]
+    if isinstance(model_knn, ItemNeighbors):
+        if return_neighbors:
+            raise ValueError("ItemNeighbors scores items directly and has no user neighbors")
+        for start in range(0, len(user_rows), chunk_size):
+            block = queries[start:start + chunk_size]
+            columns, scores = top_n(mask_seen(model_knn.score(block), block), n_recommendations)
+            yield start, columns, scores
+        return
+
+    for start, distances, indices in kneighbors_chunked(model_knn, queries, n_neighbors, chunk_size):
+        rows = user_rows[start:start + len(indices)]
+        columns, scores = top_n(score_neighbors(ratings, rows, indices), n_recommendations)
+        if return_neighbors:
+            yield start, columns, scores, distances, indices
+        else:
+            yield start, columns, scores
+
+
+def precompute_top_n(user_item, model_knn, user_rows=None, n_neighbors=10, n_recommendations=10,
+                     chunk_size=1024, out=None, return_neighbors=False):
+    """
+    Top-N arrays aligned with the matrix rows, for serving without scoring per request
+
+    Parameters:
+    user_item (UserItemMatrix): ratings the model was fitted on
+    model_knn (NearestNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors): fitted model
+    user_rows (np.ndarray): rows to score, all rows by default
+    n_neighbors (int): neighbors used to score each user
+    n_recommendations (int): items kept per user
+    chunk_size (int): users per scoring block
+    out (tuple): (columns, scores) arrays to update in place instead of new ones, e.g. to re-score
+        only some rows of a previous result
+    return_neighbors (bool): also return the neighbors found while scoring, so they need no second search
+
+    Returns:
+    tuple: int32 (users x N) columns, -1 where nothing was computed, and float32 scores, -inf there;
+        with return_neighbors also (rows, distances, indices), the kneighbors result of every scored row
+    """
+    if user_rows is None:
+        user_rows = np.arange(user_item.shape[0])
+    user_rows = np.asarray(user_rows)
+    user_rows = user_rows[user_rows >= 0]
+
+    if out is None:
+        columns = np.full((user_item.shape[0], n_recommendations), -1, dtype=np.int32)
+        scores = np.full((user_item.shape[0], n_recommendations), -np.inf, dtype=np.float32)
+    else:
+        columns, scores = out
+    if return_neighbors:
+        distances = np.empty((len(user_rows), n_neighbors))
+        indices = np.empty((len(user_rows), n_neighbors), dtype=np.int32)
+    for start, block_columns, block_scores, *neighbors in iter_top_n(user_item, model_knn, user_rows, n_neighbors,
+                                                                     n_recommendations, chunk_size, return_neighbors):
+        rows = user_rows[start:start + len(block_columns)]
+        found = np.isfinite(block_scores)
+        columns[rows] = np.where(found, block_columns, -1)
+        scores[rows] = block_scores
+        if return_neighbors:
+            distances[start:start + len(rows)], indices[start:start + len(rows)] = neighbors
+
+    if return_neighbors:
+        return columns, scores, (user_rows, distances, indices)
+    return columns, scores
+
+
+def recommend_movies_batch(user_ids_df, user_item, model_knn, movie_titles,
+                           n_neighbors=10, n_recommendations=3, chunk_size=1024):
+    """
+    Generate movie recommendations for multiple users with batched neighbor queries
+
+    Parameters:
+    user_ids_df (pd.DataFrame): DataFrame containing user_ids in an 'ID' column
+    user_item (UserItemMatrix): ratings the model was fitted on
+    model_knn (NearestNeighbors, RandomProjectionLSH, LatentNeighbors or ItemNeighbors): fitted model
+    movie_titles (pd.DataFrame or np.ndarray): ITEM_ID / TITLE lookup, or the title_array of user_item
+    n_neighbors (int): neighbors used to score each user
+    n_recommendations (int): movies recommended per user
+    chunk_size (int): users per kneighbors call, caps the distance-matrix memory
+
+    Returns:
+    pd.DataFrame: DataFrame with user_ids and their movie recommendations
+    """
+    user_ids = np.asarray(user_ids_df['ID'].values)
+    user_rows = user_item.rows_for(user_ids)
+    valid = user_rows >= 0
+    valid_ids = user_ids[valid]
+    titles = resolve_titles(movie_titles, user_item)
+
+    recommendations_by_user = {}
+    batches = iter_top_n(user_item, model_knn, user_rows[valid], n_neighbors, n_recommendations, chunk_size)
+    for start, columns, scores in batches:
+        # Resolve the titles of the whole block with one index into the title array
+        block_titles = titles[columns].tolist()
+        for user_id, user_titles, user_scores in zip(valid_ids[start:], block_titles, scores.tolist()):
+            recommendations = []
+            for title, score in zip(user_titles, user_scores):
+                if score == -np.inf:
+                    break
+                mov_obj = {}
+                mov_obj["movie_name"] = title
+                mov_obj["movie_score"] = f"{score:.2f}"
+                recommendations.append(mov_obj)
+            recommendations_by_user[user_id] = recommendations
+
+    all_recommendations = []
+    for user_id in user_ids:
+        if user_id not in recommendations_by_user:
+            print(f"Error processing user_id {user_id}: no row in the ratings matrix")
+            all_recommendations.append("Error generating recommendations")
+        else:
+            all_recommendations.append(recommendations_by_user[user_id])
+
+    return pd.DataFrame({
+        'user_id': user_ids,
+        'recommendations': all_recommendations
+    })
+
+
+def recommend_movies_batch_legacy(user_ids_df, user_movie_matrix, model_knn, movie_titles):
+    """
+    Original per-user / per-movie loop, kept as the reference for the vectorized version
+
+    Parameters:
+    user_ids_df (pd.DataFrame): DataFrame containing user_ids
+    user_movie_matrix (pd.DataFrame): dense pivoted ratings, 1-based contiguous ids
+    model_knn (NearestNeighbors): fitted neighbor model
+    movie_titles (pd.DataFrame): ITEM_ID / TITLE lookup
+
+    Returns:
+    pd.DataFrame: DataFrame with user_ids and their movie recommendations
+    """
+
+    # Initialize lists to store results
+    all_user_ids = []
+    all_recommendations = []
+
+    # Iterate through each user_id in the input DataFrame
+    for user_id in user_ids_df['ID'].values:
+        try:
+            # Get nearest neighbors for the user
+            distances, indices = model_knn.kneighbors(
+                user_movie_matrix.iloc[user_id-1, :].values.reshape(1, -1),
+                n_neighbors=10
+            )
+
+            similar_users = indices.flatten()
+            movie_scores = {}
+
+            # Calculate movie scores based on similar users
+            for i in similar_users:
+                for movie in user_movie_matrix.columns:
+                    if user_movie_matrix.iloc[user_id-1, movie-1] == 0:  # Movie not yet rated
+                        movie_scores[movie] = movie_scores.get(movie, 0) + user_movie_matrix.iloc[i, movie-1]
+
+            # Get top recommendations
+            recommended_movies = sorted(
+                movie_scores.items(),
+                key=lambda x: x[1],
+                reverse=True
+            )[:3]
+
+            # Format recommendations
+            recommendations = []
+            for movie_id, score in recommended_movies:
+                mov_obj = {}
+                mov_obj["movie_name"] = movie_titles[movie_titles['ITEM_ID'] == movie_id]['TITLE'].values[0]
+                mov_obj["movie_score"] = f"{score:.2f}"
+                recommendations.append(mov_obj)
+
+            # Append results
+            all_user_ids.append(user_id)
+            all_recommendations.append(recommendations)
+
+        except Exception as e:
+            print(f"Error processing user_id {user_id}: {str(e)}")
+            all_user_ids.append(user_id)
+            all_recommendations.append("Error generating recommendations")
+
+    # Create results DataFrame
+    results_df = pd.DataFrame({
+        'user_id': all_user_ids,
+        'recommendations': all_recommendations
+    })
+
+    return results_df
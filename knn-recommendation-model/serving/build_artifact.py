@@ -0,0 +1,41 @@
+"""
+Build a serving artifact from the bundled ma301 CSVs, for running the service locally.
+
+Fits the chosen engine, saves it with save_artifact and adds the precomputed
+top-N for every user with save_top_n:
+
+    python serving/build_artifact.py /tmp/movie_recommender --engine brute -n 10
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODEL_DIR)
+
+from artifact import save_artifact, save_top_n  # noqa: E402
+from recommender import load_user_item_matrix, make_neighbor_model, precompute_top_n  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='artifact directory to write')
+    parser.add_argument('--ratings', default=os.path.join(MODEL_DIR, 'ma301_user_ratings.csv'))
+    parser.add_argument('--titles', default=os.path.join(MODEL_DIR, 'ma301_titles.csv'))
+    parser.add_argument('--engine', default='brute')
+    parser.add_argument('--neighbors', type=int, default=10)
+    parser.add_argument('-n', type=int, default=10, help='recommendations precomputed per user')
+    args = parser.parse_args()
+
+    user_item = load_user_item_matrix(args.ratings)
+    model = make_neighbor_model(args.engine, n_neighbors=args.neighbors).fit(user_item.matrix)
+    save_artifact(args.path, user_item, model, pd.read_csv(args.titles))
+    top_columns, top_scores = precompute_top_n(user_item, model, n_neighbors=args.neighbors, n_recommendations=args.n)
+    save_top_n(args.path, top_columns, top_scores, n_neighbors=args.neighbors)
+    print(f"{args.engine} artifact with top-{args.n} for {user_item.shape[0]} users written to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Load test for the recommendation service: latency percentiles and throughput.
+
+Requests GET /recommendations/<user_id> for user ids drawn uniformly from
+1..--max-user-id (ids above the known users exercise the popularity fallback).
+Point it at a running service, or pass --in-process to call the Flask app
+through its test client, which leaves out the network and the HTTP server:
+
+    python serving/load_test.py --url http://localhost:8082 --requests 5000 --concurrency 8
+    RECOMMENDER_ARTIFACT=/tmp/movie_recommender python serving/load_test.py --in-process
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SERVING_SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def http_get(url):
+    def get(path):
+        with urllib.request.urlopen(url + path) as response:
+            response.read()
+            return response.status
+    return get
+
+
+def in_process_get():
+    sys.path[:0] = [SERVING_SRC, MODEL_DIR]
+    from app import app
+    client = app.test_client()
+
+    def get(path):
+        return client.get(path).status_code
+    return get
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8082')
+    parser.add_argument('--in-process', action='store_true', help='call the app in this process, no HTTP')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--max-user-id', type=int, default=1000)
+    parser.add_argument('-n', type=int, default=3, help='recommendations per request')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    get = in_process_get() if args.in_process else http_get(args.url.rstrip('/'))
+    rng = random.Random(args.seed)
+    paths = [f'/recommendations/{rng.randint(1, args.max_user_id)}?n={args.n}' for _ in range(args.requests)]
+
+    def timed(path):
+        start = time.perf_counter()
+        status = get(path)
+        return time.perf_counter() - start, status
+
+    # Warm up caches and connections before measuring
+    for path in paths[:min(50, len(paths))]:
+        get(path)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(timed, paths))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, _ in results)
+    errors = sum(status != 200 for _, status in results)
+    print(f"{len(results)} requests, concurrency {args.concurrency}, {errors} errors")
+    print(f"throughput {len(results) / elapsed:.0f} req/s")
+    print(f"latency ms  p50 {percentile(latencies, 50):.2f}  p90 {percentile(latencies, 90):.2f}  "
+          f"p99 {percentile(latencies, 99):.2f}  max {latencies[-1]:.2f}")
+
+
+if __name__ == '__main__':
+    main()
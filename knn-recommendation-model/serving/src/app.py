@@ -0,0 +1,18 @@
+from flask import Flask, jsonify, make_response
+import os
+from recommendations import recommendations, user_item
+
+app = Flask(__name__)
+app.register_blueprint(recommendations)
+
+@app.route("/")
+def default():
+    return make_response(jsonify(result='Movie recommendations', users=int(user_item.shape[0])))
+
+@app.errorhandler(404)
+def resource_not_found(e):
+    return make_response(jsonify(error='Not found!'), 404)
+
+if __name__ == '__main__':
+    api_port=int(os.getenv('API_PORT') or 8082)
+    app.run(port=api_port, host='0.0.0.0', threaded=True)
@@ -0,0 +1,64 @@
+from flask import Blueprint, request, abort, make_response, jsonify
+import os
+import numpy as np
+
+from artifact import load_artifact
+from recommender import iter_top_n
+
+# Fitted model, titles and precomputed top-N, memory-mapped from the saved artifact
+artifact = load_artifact(os.getenv('RECOMMENDER_ARTIFACT') or '/models/movie_recommender')
+user_item = artifact.user_item
+default_n = int(os.getenv('RECOMMENDATIONS_N') or 3)
+max_n = 100
+
+# On-demand scoring uses the neighbor count of the precomputed top-N, so both sources rank alike
+n_neighbors = artifact.top_n_neighbors or (artifact.model.n_neighbors if artifact.model is not None else 10)
+
+# Most rated movies, for users the model has never seen
+rating_counts = np.bincount(user_item.matrix.indices, minlength=user_item.shape[1])
+popular_columns = np.argsort(-rating_counts, kind='stable')[:max_n]
+
+# Make the API endpoints
+recommendations = Blueprint('recommendations', __name__)
+
+
+def lookup(user_id, n):
+    row = user_item.rows_for([user_id])[0]
+    if row < 0 or artifact.model is None:
+        return 'popular', popular_columns[:n], rating_counts[popular_columns[:n]]
+
+    top_columns = artifact.top_columns
+    if top_columns is not None and row < len(top_columns) and n <= top_columns.shape[1] and top_columns[row, 0] >= 0:
+        columns = top_columns[row, :n]
+        return 'batch', columns[columns >= 0], artifact.top_scores[row, :n][columns >= 0]
+
+    # Not in the precomputed batch: score this one user now
+    _, columns, scores = next(iter_top_n(user_item, artifact.model, np.array([row]),
+                                         n_neighbors=n_neighbors, n_recommendations=n))
+    found = np.isfinite(scores[0])
+    return 'on_demand', columns[0][found], scores[0][found]
+
+
+## Recommendations for one user
+@recommendations.route('/recommendations/<int:user_id>')
+def user_recommendations(user_id):
+    # Validate arguments
+    n_str = request.args.get('n') or str(default_n)
+    try:
+        n = int(n_str)
+        if not 0 < n <= max_n:
+            raise ValueError(n)
+    except ValueError:
+        abort(400, "Invalid arguments.")
+
+    source, columns, scores = lookup(user_id, n)
+    movie_ids = user_item.item_ids[columns].tolist()
+    movie_names = artifact.titles[columns].tolist() if artifact.titles is not None else [''] * len(movie_ids)
+    return make_response(jsonify(
+        user_id=user_id,
+        source=source,
+        recommendations=[
+            {'item_id': movie_id, 'movie_name': movie_name, 'movie_score': round(float(score), 2)}
+            for movie_id, movie_name, score in zip(movie_ids, movie_names, scores.tolist())
+        ]
+    ))
@@ -0,0 +1,71 @@
+"""
+Sharded batch inference for the KNN movie recommender on a process pool.
+
+Every worker memory-maps the same saved artifact (see artifact.py), so model
+arrays are shared read-only through the page cache instead of being pickled to
+each process. Shards are merged back in submission order, so the output does
+not depend on which worker finishes first.
+"""
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from artifact import load_artifact
+from recommender import recommend_movies_batch
+
+# Per-process state, set once by _init_worker
+_artifact = None
+
+
+def _init_worker(artifact_path):
+    global _artifact
+    # One compute thread per process, the pool provides the parallelism
+    threadpool_limits(1)
+    _artifact = load_artifact(artifact_path)
+    if hasattr(_artifact.model, 'n_jobs'):
+        _artifact.model.n_jobs = 1
+
+
+def _recommend_shard(user_ids, n_neighbors, n_recommendations, chunk_size):
+    return recommend_movies_batch(
+        pd.DataFrame({'ID': user_ids}), _artifact.user_item, _artifact.model, _artifact.titles,
+        n_neighbors=n_neighbors, n_recommendations=n_recommendations, chunk_size=chunk_size
+    )
+
+
+def recommend_movies_sharded(artifact_path, user_ids_df, n_workers=4, shard_size=None,
+                             n_neighbors=10, n_recommendations=3, chunk_size=1024):
+    """
+    Generate movie recommendations for multiple users on a pool of worker processes
+
+    Parameters:
+    artifact_path (str): artifact saved with save_artifact, including the model and titles
+    user_ids_df (pd.DataFrame): DataFrame containing user_ids in an 'ID' column
+    n_workers (int): worker processes
+    shard_size (int): users per task, defaults to about four shards per worker
+    n_neighbors (int): neighbors used to score each user
+    n_recommendations (int): movies recommended per user
+    chunk_size (int): users per kneighbors call inside a shard
+
+    Returns:
+    pd.DataFrame: DataFrame with user_ids and their movie recommendations, in input order
+    """
+    user_ids = user_ids_df['ID'].to_numpy()
+    shard_size = shard_size or max(1, math.ceil(len(user_ids) / (n_workers * 4)))
+    shards = [user_ids[start:start + shard_size] for start in range(0, len(user_ids), shard_size)]
+
+    # spawn: workers must not inherit the parent's OpenMP / BLAS thread state
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(artifact_path,)) as executor:
+        futures = [
+            executor.submit(_recommend_shard, shard, n_neighbors, n_recommendations, chunk_size)
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+
+    if not results:
+        return pd.DataFrame({'user_id': user_ids, 'recommendations': []})
+    return pd.concat(results, ignore_index=True)
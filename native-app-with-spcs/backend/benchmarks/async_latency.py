@@ -0,0 +1,42 @@
+"""
+Threaded gunicorn against the async (hypercorn + Quart) backend with slow queries.
+
+Both servers run as one process on a stubbed Snowflake session (see
+stub_snowflake.py) whose queries take --latency seconds. The threaded server
+can only hold as many requests in flight as it has threads; the async server
+awaits submitted jobs, so its in-flight count is bounded by the client:
+
+    python benchmarks/async_latency.py
+    python benchmarks/async_latency.py --latency 1 --concurrency 400 --threads 16
+"""
+import argparse
+import os
+import sys
+
+from serving_modes import BACKEND_SRC, run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per stubbed query')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='threads of the gunicorn worker')
+    parser.add_argument('--port', type=int, default=18082)
+    args = parser.parse_args()
+
+    env = dict(os.environ, STUB_QUERY_LATENCY=str(args.latency), API_PORT=str(args.port),
+               TOP_CLERKS_CACHE_SIZE='0', CLERK_ROLLUP='0', SNOWFLAKE_POOL_MAX=str(args.threads),
+               GUNICORN_WORKERS='1', GUNICORN_THREADS=str(args.threads), PYTHONPATH=BACKEND_SRC)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency * 1000:.0f} ms per query")
+    print(f"{'mode':<32} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    run(f'gunicorn 1 worker x {args.threads} threads',
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_SRC, 'gunicorn.conf.py'),
+         '--bind', f'127.0.0.1:{args.port}', 'stub_app:app'], env, args)
+    run('hypercorn async, 1 worker',
+        [sys.executable, '-m', 'hypercorn', '--bind', f'127.0.0.1:{args.port}', 'stub_async_app:app'], env, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Client CPU per top_clerks request: the Snowpark DataFrame chain against the bound query template.
+
+Uses the real snowflake-snowpark-python package on a mocked connection, so no
+Snowflake account is needed and no query runs. What is measured is the work
+done in the backend process to get a request's query to the connector, that
+is building the plan, compiling it to SQL and handing it to the connection:
+
+    python benchmarks/query_overhead.py
+    python benchmarks/query_overhead.py --requests 2000
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from unittest import mock
+
+import snowflake.snowpark.functions as f
+from snowflake.snowpark import Session
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from queries import top_clerks_df  # noqa: E402
+
+
+# The query as built before the templates: a DataFrame chain with the dates inlined as literals
+def top_clerks_chain(session, sdt, edt, topn):
+    return session.sql("SELECT * FROM Reference('ORDERS_TABLE')") \
+            .filter(f.col('O_ORDERDATE') >= sdt) \
+            .filter(f.col('O_ORDERDATE') <= edt) \
+            .group_by(f.col('O_CLERK')) \
+            .agg(f.sum(f.col('O_TOTALPRICE')).as_('CLERK_TOTAL')) \
+            .order_by(f.col('CLERK_TOTAL').desc()) \
+            .limit(topn)
+
+
+def mocked_session():
+    connection = mock.MagicMock()
+    connection.is_closed.return_value = False
+    return connection, Session.builder.configs({'connection': connection}).create()
+
+
+def run(build, requests):
+    connection, session = mocked_session()
+    cursor = connection.cursor.return_value
+    windows = [(datetime.datetime(1995, 1, 1), datetime.datetime(1995, 1 + i % 12, 1 + i % 28), 1 + i % 20)
+               for i in range(requests)]
+    build(session, *windows[0]).collect()
+    cursor.reset_mock()
+
+    start = time.process_time()
+    for sdt, edt, topn in windows:
+        build(session, sdt, edt, topn).collect()
+    seconds = time.process_time() - start
+    return {
+        'ms': seconds / requests * 1000,
+        'queries': cursor.execute.call_count / requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'query':<20} {'cpu_ms/req':>10} {'queries/req':>11}")
+    for name, build in (('dataframe chain', top_clerks_chain), ('bound template', top_clerks_df)):
+        result = run(build, args.requests)
+        print(f"{name:<20} {result['ms']:>10.3f} {result['queries']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
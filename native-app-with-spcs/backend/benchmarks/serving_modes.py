@@ -0,0 +1,92 @@
+"""
+Throughput of the Flask dev server against gunicorn on a stubbed Snowflake session.
+
+Each mode is started as a subprocess of stub_app.py, with no Snowflake account
+needed. Every query sleeps STUB_QUERY_LATENCY seconds as its warehouse round
+trip (see stub_snowflake.py). The result cache and the clerk rollup are turned
+off, so each request reaches the session:
+
+    python benchmarks/serving_modes.py
+    python benchmarks/serving_modes.py --latency 0.2 --concurrency 64 --workers 4 --threads 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_SRC = os.path.join(os.path.dirname(BENCHMARK_DIR), 'src')
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/readyz') as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def load(url, requests, concurrency):
+    # Distinct windows, as different dashboard users would ask for
+    paths = [f'/snowpark/top_clerks?start_range=1995-01-01&end_range=1995-03-{1 + i % 28:02d}&topn={1 + i % 20}'
+             for i in range(requests)]
+
+    def get(path):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url + path) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(get, paths))
+    return len(paths) / (time.perf_counter() - start), latencies
+
+
+def run(name, command, env, args):
+    server = subprocess.Popen(command, cwd=BENCHMARK_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{env["API_PORT"]}'
+        wait_ready(url)
+        throughput, latencies = load(url, args.requests, args.concurrency)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+        print(f"{name:<32} {throughput:>8.1f} {p50:>8.1f} {p99:>8.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per stubbed query')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=18081)
+    args = parser.parse_args()
+
+    env = dict(os.environ, STUB_QUERY_LATENCY=str(args.latency), API_PORT=str(args.port),
+               TOP_CLERKS_CACHE_SIZE='0', CLERK_ROLLUP='0',
+               SNOWFLAKE_POOL_MAX=str(args.threads), GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_THREADS=str(args.threads), PYTHONPATH=BACKEND_SRC)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency * 1000:.0f} ms per query")
+    print(f"{'mode':<32} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    run('flask dev server', [sys.executable, 'stub_app.py'], env, args)
+    run(f'gunicorn {args.workers} workers x {args.threads} threads',
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_SRC, 'gunicorn.conf.py'),
+         '--bind', f'127.0.0.1:{args.port}', 'stub_app:app'], env, args)
+
+
+if __name__ == '__main__':
+    main()
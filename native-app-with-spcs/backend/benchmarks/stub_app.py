@@ -0,0 +1,14 @@
+"""The backend app on the stubbed Snowflake session (see stub_snowflake.py)."""
+import os
+import sys
+
+BACKEND_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, BACKEND_SRC)
+
+import stub_snowflake  # noqa: E402
+stub_snowflake.install()
+
+from app import app  # noqa: E402, F401
+
+if __name__ == '__main__':
+    app.run(port=int(os.getenv('API_PORT') or 8081), host='127.0.0.1')
@@ -0,0 +1,11 @@
+"""The async backend app on the stubbed Snowflake session (see stub_snowflake.py)."""
+import os
+import sys
+
+BACKEND_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, BACKEND_SRC)
+
+import stub_snowflake  # noqa: E402
+stub_snowflake.install()
+
+from async_app import app  # noqa: E402, F401
@@ -0,0 +1,145 @@
+"""
+In-process stand-in for the Snowflake client packages, for local benchmarks only.
+
+install() registers fake `snowflake.connector`, `snowflake.snowpark` and
+`snowflake.snowpark.functions` modules before the backend is imported. The
+fake session accepts the DataFrame calls the backend makes and answers every
+query after sleeping STUB_QUERY_LATENCY seconds (default 0.05), which stands
+in for the warehouse round trip. collect_nowait() returns a job that is done
+once that latency has passed, without sleeping. Rows are synthetic.
+"""
+import datetime
+import itertools
+import os
+import sys
+import time
+import types
+from contextlib import contextmanager
+
+_query_ids = itertools.count(1)
+
+
+class Row(dict):
+    def as_dict(self):
+        return dict(self)
+
+
+class Column:
+    def __init__(self, name):
+        self.name = name
+
+    def __ge__(self, other):
+        return self
+
+    def __le__(self, other):
+        return self
+
+    def desc(self):
+        return self
+
+    def as_(self, alias):
+        return Column(alias)
+
+
+class DataFrame:
+    def __init__(self, session, limit=10):
+        self.session = session
+        self._limit = limit
+
+    def filter(self, *args):
+        return self
+
+    def group_by(self, *args):
+        return self
+
+    def agg(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def limit(self, n):
+        return DataFrame(self.session, n)
+
+    def _rows(self, wait=True):
+        self.session.history.append(types.SimpleNamespace(query_id=f'stub-{next(_query_ids)}', sql_text=''))
+        if wait:
+            time.sleep(self.session.latency)
+        return [Row(O_CLERK=f'Clerk#{i:09d}', CLERK_TOTAL=1e7 - i) for i in range(self._limit)]
+
+    def collect(self):
+        return self._rows()
+
+    def collect_nowait(self):
+        return AsyncJob(self)
+
+    def to_local_iterator(self):
+        return iter(self._rows())
+
+    def to_pandas(self):
+        import pandas as pd
+        time.sleep(self.session.latency)
+        return pd.DataFrame({'O_ORDERDATE': [datetime.date(1995, 1, 1)], 'O_CLERK': ['Clerk#000000001'],
+                             'TOTAL': [1.0], 'ORDERS': [1]})
+
+
+class AsyncJob:
+    def __init__(self, df):
+        self._df = df
+        self._done_at = time.monotonic() + df.session.latency
+        self.query_id = f'stub-{next(_query_ids)}'
+
+    def is_done(self):
+        return time.monotonic() >= self._done_at
+
+    def result(self):
+        time.sleep(max(0.0, self._done_at - time.monotonic()))
+        return self._df._rows(wait=False)
+
+
+class Session:
+    def __init__(self, latency):
+        self.latency = latency
+        self.history = []
+
+    def sql(self, query, params=None):
+        # The query templates bind the row limit last
+        return DataFrame(self, int(params[-1])) if params else DataFrame(self)
+
+    @contextmanager
+    def query_history(self):
+        start = len(self.history)
+        record = types.SimpleNamespace(queries=[])
+        yield record
+        record.queries = self.history[start:]
+
+    def close(self):
+        pass
+
+
+class _Builder:
+    def configs(self, options):
+        return self
+
+    def create(self):
+        return Session(float(os.getenv('STUB_QUERY_LATENCY') or 0.05))
+
+
+def install():
+    snowflake = types.ModuleType('snowflake')
+    connector = types.ModuleType('snowflake.connector')
+    snowpark = types.ModuleType('snowflake.snowpark')
+    functions = types.ModuleType('snowflake.snowpark.functions')
+    connector.SnowflakeConnection = object
+    connector.connect = lambda **creds: object()
+    Session.builder = _Builder()
+    snowpark.Session = Session
+    snowpark.functions = functions
+    functions.col = Column
+    functions.sum = lambda column: column
+    snowflake.connector = connector
+    snowflake.snowpark = snowpark
+    sys.modules.update({
+        'snowflake': snowflake, 'snowflake.connector': connector,
+        'snowflake.snowpark': snowpark, 'snowflake.snowpark.functions': functions,
+    })
@@ -1,14 +1,54 @@
-from flask import Flask, jsonify, make_response
+from flask import Flask, Response, g, jsonify, make_response, request
 import os
-from snowpark import snowpark
+import time
+from snowpark import snowpark, pool, clerk_rollup
+from spcs_helpers.metrics import metrics, record_request, count_bytes
 
 app = Flask(__name__)
 app.register_blueprint(snowpark, url_prefix='/snowpark')
 
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    size = None
+    if response.is_streamed:
+        response.response = count_bytes(route, response.response)
+    else:
+        size = response.content_length
+    seconds = time.perf_counter() - g.get('request_start', time.perf_counter())
+    record_request(route, request.method, response.status_code, seconds, size)
+    return response
+
 @app.route("/")
 def default():
     return make_response(jsonify(result='Nothing to see here'))
 
+## Liveness: the process is up and serving
+@app.route("/healthz")
+def healthz():
+    return make_response(jsonify(status='ok'))
+
+## Readiness: a pooled Snowflake session answers
+@app.route("/readyz")
+def readyz():
+    try:
+        with pool.checkout(timeout=float(os.getenv('READYZ_TIMEOUT') or 2)) as session:
+            ready = pool.healthy(session)
+    except Exception:
+        ready = False
+    body = {'ready': ready, 'sessions': pool.stats(),
+            'clerk_rollup': clerk_rollup is not None and clerk_rollup.ready()}
+    return make_response(jsonify(body), 200 if ready else 503)
+
+## Prometheus metrics of this process
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def resource_not_found(e):
     return make_response(jsonify(error='Not found!'), 404)
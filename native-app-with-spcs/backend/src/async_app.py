@@ -0,0 +1,57 @@
+# Async (ASGI) variant of app.py: hypercorn async_app:app, or SERVER_MODE=async in entrypoint.sh
+from quart import Quart, Response, g, jsonify, make_response, request
+import asyncio
+import os
+import time
+from snowpark_async import snowpark, pool, clerk_rollup
+from spcs_helpers.metrics import metrics, record_request
+
+app = Quart(__name__)
+app.register_blueprint(snowpark, url_prefix='/snowpark')
+
+@app.before_request
+async def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def record_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    seconds = time.perf_counter() - g.get('request_start', time.perf_counter())
+    record_request(route, request.method, response.status_code, seconds, response.content_length)
+    return response
+
+@app.route("/")
+async def default():
+    return await make_response(jsonify(result='Nothing to see here'))
+
+## Liveness: the process is up and serving
+@app.route("/healthz")
+async def healthz():
+    return await make_response(jsonify(status='ok'))
+
+## Readiness: a pooled Snowflake session answers
+@app.route("/readyz")
+async def readyz():
+    def check():
+        with pool.checkout(timeout=float(os.getenv('READYZ_TIMEOUT') or 2)) as session:
+            return pool.healthy(session)
+    try:
+        ready = await asyncio.to_thread(check)
+    except Exception:
+        ready = False
+    body = {'ready': ready, 'sessions': pool.stats(),
+            'clerk_rollup': clerk_rollup is not None and clerk_rollup.ready()}
+    return await make_response(jsonify(body), 200 if ready else 503)
+
+## Prometheus metrics of this process
+@app.route("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.errorhandler(404)
+async def resource_not_found(e):
+    return await make_response(jsonify(error='Not found!'), 404)
+
+if __name__ == '__main__':
+    api_port=int(os.getenv('API_PORT') or 8081)
+    app.run(port=api_port, host='0.0.0.0')
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from decimal import Decimal
+import numpy as np
+
+# Every clerk with its first and last order date, in O_CLERK order
+CLERKS_SQL = """
+SELECT O_CLERK, MIN(O_ORDERDATE) AS FIRST_DAY, MAX(O_ORDERDATE) AS LAST_DAY
+FROM Reference('ORDERS_TABLE')
+GROUP BY O_CLERK
+ORDER BY O_CLERK
+"""
+
+# One row per (day, clerk) with orders, aggregated in the warehouse down to
+# integers: DAY is the offset from the first order date, CLERK the position of
+# O_CLERK in CLERKS_SQL and CENTS the total in cents
+DAILY_TOTALS_SQL = """
+SELECT DATEDIFF(day, ?::DATE, O_ORDERDATE) AS DAY,
+       DENSE_RANK() OVER (ORDER BY O_CLERK) - 1 AS CLERK,
+       (SUM(O_TOTALPRICE) * 100)::BIGINT AS CENTS
+FROM Reference('ORDERS_TABLE')
+WHERE O_ORDERDATE BETWEEN ?::DATE AND ?::DATE
+GROUP BY O_ORDERDATE, O_CLERK
+"""
+
+class ClerkRollup:
+    """
+    Per-day x per-clerk order totals held in memory as cumulative sums.
+
+    The totals of any [start, end] date range are the difference of two prefix
+    rows, so top_clerks() answers in O(clerks) without scanning ORDERS. Totals
+    are kept in integer cents, so sums are exact like the SQL aggregate, and
+    returned as Decimal like the warehouse rows, so responses serialize alike.
+    refresh() rebuilds from the reference table; start() also repeats it every
+    `refresh_seconds` on a background thread. Sessions come from `pool`
+    (spcs_helpers.connection.SessionPool). A rollup of more than `max_cells`
+    (days x clerks, about 10 bytes each) is not built, and top_clerks stays on
+    the warehouse.
+    """
+
+    def __init__(self, pool, refresh_seconds=3600, max_cells=5_000_000):
+        self.pool = pool
+        self.refresh_seconds = refresh_seconds
+        self.max_cells = max_cells
+        self.built_at = None
+        self._state = None
+
+    def ready(self):
+        return self._state is not None
+
+    def refresh(self):
+        with self.pool.checkout() as session:
+            bounds = session.sql(CLERKS_SQL).to_pandas()
+            if len(bounds) == 0:
+                return
+            clerks = bounds['O_CLERK'].to_numpy().astype(str)
+            first = np.datetime64(bounds['FIRST_DAY'].min(), 'D')
+            last = np.datetime64(bounds['LAST_DAY'].max(), 'D')
+            n_days = int((last - first).astype(np.int64)) + 1
+            n_clerks = len(clerks)
+            if (n_days + 1) * n_clerks > self.max_cells:
+                logging.warning("Clerk rollup not built: %d days x %d clerks is over CLERK_ROLLUP_MAX_CELLS=%d",
+                                n_days, n_clerks, self.max_cells)
+                return
+
+            # Row d + 1 holds the totals of all days up to and including first + d. GROUP BY
+            # gives each (day, clerk) one row, so the rows are placed, not added up.
+            cents = np.zeros((n_days + 1, n_clerks), dtype=np.int64)
+            # Days with orders, only to tell clerks with orders in a range from those without
+            days = np.zeros((n_days + 1, n_clerks), dtype=np.uint16 if n_days < 2 ** 16 else np.int32)
+            daily = session.sql(DAILY_TOTALS_SQL, params=[str(first), str(first), str(last)])
+            for batch in daily.to_pandas_batches():
+                clerk_idx = batch['CLERK'].to_numpy(dtype=np.int64)
+                if len(clerk_idx) and clerk_idx.max() >= n_clerks:
+                    raise RuntimeError("ORDERS gained clerks during the clerk rollup refresh")
+                flat = (batch['DAY'].to_numpy(dtype=np.int64) + 1) * n_clerks + clerk_idx
+                cents.ravel()[flat] = batch['CENTS'].to_numpy(dtype=np.int64)
+                days.ravel()[flat] = 1
+        np.cumsum(cents, axis=0, out=cents)
+        np.cumsum(days, axis=0, out=days)
+
+        # Swapped in as one tuple, so readers never see a half-built rollup
+        self._state = (first, clerks, cents, days)
+        self.built_at = time.time()
+
+    def start(self):
+        """Build in the background now and then every refresh_seconds"""
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception:
+                    logging.exception("Clerk rollup refresh failed")
+                time.sleep(self.refresh_seconds)
+        threading.Thread(target=run, name='clerk-rollup', daemon=True).start()
+
+    def top_clerks(self, sdt, edt, topn):
+        """Same rows as the top_clerks query: clerks with orders in [sdt, edt] by total, highest first"""
+        first, clerks, cents, days = self._state
+        n_days = len(cents) - 1
+        lo = min(max(int((np.datetime64(sdt.date()) - first).astype(np.int64)), 0), n_days)
+        hi = min(max(int((np.datetime64(edt.date()) - first).astype(np.int64)) + 1, lo), n_days)
+        totals = cents[hi] - cents[lo]
+        active = np.flatnonzero(days[hi] != days[lo])
+        if topn <= 0 or len(active) == 0:
+            return []
+
+        if topn < len(active):
+            active = active[np.argpartition(-totals[active], topn - 1)[:topn]]
+        active = active[np.lexsort((clerks[active], -totals[active]))]
+        return [{'O_CLERK': clerks[i], 'CLERK_TOTAL': Decimal(int(totals[i])).scaleb(-2)} for i in active]
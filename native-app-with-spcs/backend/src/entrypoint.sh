@@ -1,2 +1,8 @@
 #!/bin/bash
-python3 app.py
+if [ "$SERVER_MODE" = "dev" ]; then
+    python3 app.py
+elif [ "$SERVER_MODE" = "async" ]; then
+    hypercorn async_app:app --bind 0.0.0.0:${API_PORT:-8081} --workers ${HYPERCORN_WORKERS:-1}
+else
+    gunicorn -c gunicorn.conf.py app:app
+fi
@@ -0,0 +1,19 @@
+# Production serving: gunicorn -c gunicorn.conf.py app:app (the default in entrypoint.sh)
+import os
+
+bind = f"0.0.0.0:{int(os.getenv('API_PORT') or 8081)}"
+# A small fixed default: the host CPU count seen inside a container is not its
+# CPU limit, and every worker costs warehouse work of its own. Each one opens
+# SNOWFLAKE_POOL_MIN sessions and, with CLERK_ROLLUP on, runs its own full
+# ORDERS GROUP BY at boot and every CLERK_ROLLUP_REFRESH seconds. Concurrency
+# within a worker comes from its threads.
+workers = int(os.getenv('GUNICORN_WORKERS') or 2)
+threads = int(os.getenv('GUNICORN_THREADS') or 4)
+timeout = int(os.getenv('GUNICORN_TIMEOUT') or 120)
+
+# No preload: every worker imports the app after the fork, which opens its own
+# SNOWFLAKE_POOL_MIN sessions before the worker accepts any request. Forked
+# workers must not share the parent's connections.
+preload_app = False
+
+accesslog = '-'
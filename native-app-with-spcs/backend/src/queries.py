@@ -0,0 +1,63 @@
+class QueryTemplate:
+    """
+    SQL text fixed once when registered, executed with bind variables.
+
+    Requests only supply the bind values: no Snowpark DataFrame plan is built
+    and no schema lookup is made per call, and equal arguments produce the same
+    SQL text, so Snowflake can answer repeats from its result cache.
+    """
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+
+    def df(self, session, *params):
+        return session.sql(self.text, params=list(params))
+
+# All query texts the backend runs, by name
+templates = {}
+
+def register(name, text):
+    templates[name] = QueryTemplate(name, text)
+    return templates[name]
+
+TOP_CLERKS = register('top_clerks', """
+SELECT O_CLERK, SUM(O_TOTALPRICE) AS CLERK_TOTAL
+FROM Reference('ORDERS_TABLE')
+WHERE O_ORDERDATE BETWEEN ?::DATE AND ?::DATE
+GROUP BY O_CLERK
+QUALIFY ROW_NUMBER() OVER (ORDER BY CLERK_TOTAL DESC) <= ?
+ORDER BY CLERK_TOTAL DESC
+""")
+
+# Every order is joined to each window it falls in, so one scan of ORDERS serves all windows
+TOP_CLERKS_WINDOWS_SQL = """
+WITH WINDOWS AS (
+    SELECT column1 AS WINDOW_ID, column2::DATE AS START_DATE, column3::DATE AS END_DATE
+    FROM (VALUES {values})
+)
+SELECT w.WINDOW_ID, o.O_CLERK, SUM(o.O_TOTALPRICE) AS CLERK_TOTAL
+FROM Reference('ORDERS_TABLE') o
+JOIN WINDOWS w ON o.O_ORDERDATE BETWEEN w.START_DATE AND w.END_DATE
+GROUP BY w.WINDOW_ID, o.O_CLERK
+QUALIFY ROW_NUMBER() OVER (PARTITION BY w.WINDOW_ID ORDER BY CLERK_TOTAL DESC) <= ?
+ORDER BY w.WINDOW_ID, CLERK_TOTAL DESC
+"""
+
+def top_clerks_windows_template(n_windows):
+    # One text per window count, registered the first time that count is asked for
+    name = f'top_clerks_windows_{n_windows}'
+    if name not in templates:
+        register(name, TOP_CLERKS_WINDOWS_SQL.format(values=', '.join(['(?, ?, ?)'] * n_windows)))
+    return templates[name]
+
+## Top clerks by order total in [sdt, edt]
+def top_clerks_df(session, sdt, edt, topn):
+    return TOP_CLERKS.df(session, f'{sdt:%Y-%m-%d}', f'{edt:%Y-%m-%d}', int(topn))
+
+## Top clerks of several [sdt, edt] windows in one query, rows tagged with the window's index
+def top_clerks_windows_df(session, windows, topn):
+    params = []
+    for i, (sdt, edt) in enumerate(windows):
+        params += [i, f'{sdt:%Y-%m-%d}', f'{edt:%Y-%m-%d}']
+    return top_clerks_windows_template(len(windows)).df(session, *params, int(topn))
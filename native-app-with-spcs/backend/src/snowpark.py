@@ -1,15 +1,111 @@
-from flask import Blueprint, request, abort, make_response, jsonify
+from flask import Blueprint, Response, current_app, request, abort, make_response, jsonify
 import datetime
-import snowflake.snowpark.functions as f
+import itertools
+import os
 
-from spcs_helpers.connection import session as snow_session
-session = snow_session()
+from clerk_rollup import ClerkRollup
+from queries import top_clerks_df, top_clerks_windows_df
+from spcs_helpers.cache import TTLCache
+from spcs_helpers.connection import session_pool
+from spcs_helpers.metrics import metrics, timed_query
+from spcs_helpers.singleflight import SingleFlight
+# Each request checks out its own session, so concurrent queries run in parallel
+pool = session_pool()
 
 # Make the API endpoints
 snowpark = Blueprint('snowpark', __name__)
 
 dateformat = '%Y-%m-%d'
 
+# ORDERS is historical, so results for a window can be reused for a while
+top_clerks_cache = TTLCache(maxsize=int(os.getenv('TOP_CLERKS_CACHE_SIZE') or 256),
+                            ttl=float(os.getenv('TOP_CLERKS_CACHE_TTL') or 300))
+
+# Concurrent misses for the same window (e.g. a dashboard load) share one warehouse query
+top_clerks_flights = SingleFlight()
+
+# Daily per-clerk totals kept in memory; answers any window without scanning ORDERS.
+# Off by default: every worker holds its own copy and refreshes it from the
+# warehouse. CLERK_ROLLUP=1 turns it on for ORDERS tables up to
+# CLERK_ROLLUP_MAX_CELLS days x clerks; larger ones stay on the warehouse.
+clerk_rollup = None
+if (os.getenv('CLERK_ROLLUP') or '0') != '0':
+    clerk_rollup = ClerkRollup(pool, refresh_seconds=float(os.getenv('CLERK_ROLLUP_REFRESH') or 3600),
+                               max_cells=int(os.getenv('CLERK_ROLLUP_MAX_CELLS') or 5_000_000))
+    clerk_rollup.start()
+
+# Most windows accepted by one top_clerks_batch request
+max_batch_windows = int(os.getenv('TOP_CLERKS_BATCH_MAX') or 100)
+
+# Results at least this large are streamed from the row iterator instead of cached as a list
+stream_min_rows = int(os.getenv('TOP_CLERKS_STREAM_MIN') or 1000)
+
+metrics.gauge('top_clerks_cache_hits_total', lambda: top_clerks_cache.hits, 'top_clerks cache hits', 'counter')
+metrics.gauge('top_clerks_cache_misses_total', lambda: top_clerks_cache.misses, 'top_clerks cache misses', 'counter')
+metrics.gauge('top_clerks_cache_hit_ratio',
+              lambda: top_clerks_cache.hits / max(1, top_clerks_cache.hits + top_clerks_cache.misses),
+              'Share of top_clerks cache lookups that hit')
+metrics.gauge('top_clerks_coalesced_total', lambda: top_clerks_flights.coalesced,
+              'top_clerks requests that waited for an identical query in flight', 'counter')
+metrics.gauge('snowflake_pool_sessions', lambda: pool.stats()['size'], 'Open pooled Snowflake sessions')
+metrics.gauge('snowflake_pool_idle_sessions', lambda: pool.stats()['idle'], 'Idle pooled Snowflake sessions')
+metrics.gauge('clerk_rollup_ready', lambda: int(clerk_rollup is not None and clerk_rollup.ready()),
+              'Whether top_clerks is answered from the in-memory rollup')
+
+def query_top_clerks(sdt, edt, topn):
+    with pool.checkout() as session, timed_query(session, 'top_clerks') as query:
+        df = top_clerks_df(session, sdt, edt, topn)
+        clerks = [x.as_dict() for x in df.to_local_iterator()]
+        query['rows'] = len(clerks)
+        return clerks
+
+def iter_top_clerks(sdt, edt, topn):
+    # The session stays checked out until the response has been sent
+    with pool.checkout() as session, timed_query(session, 'top_clerks') as query:
+        for x in top_clerks_df(session, sdt, edt, topn).to_local_iterator():
+            query['rows'] += 1
+            yield x.as_dict()
+
+def query_top_clerks_windows(windows, topn):
+    with pool.checkout() as session, timed_query(session, 'top_clerks_windows') as query:
+        rows = top_clerks_windows_df(session, windows, topn).collect()
+        query['rows'] = len(rows)
+    by_window = [[] for _ in windows]
+    for x in rows:
+        clerk = x.as_dict()
+        by_window[clerk.pop('WINDOW_ID')].append(clerk)
+    return by_window
+
+def stream_rows(rows, ndjson=False, chunk_rows=500):
+    """
+    Streaming response of an iterable of dicts: a JSON array, or one object per line with ndjson=True.
+
+    Rows are serialized as they are read and sent in chunks of `chunk_rows`
+    with chunked transfer encoding, so memory stays constant however many rows
+    there are. The first row is read before the response starts, so failing to
+    run the query still raises here and can become a proper error status.
+    """
+    rows = iter(rows)
+    first = list(itertools.islice(rows, 1))
+    dumps = current_app.json.dumps
+    separator = '\n' if ndjson else ','
+
+    def generate():
+        if not ndjson:
+            yield '['
+        chunk = [dumps(row) for row in first]
+        for row in rows:
+            if len(chunk) == chunk_rows:
+                yield separator.join(chunk) + separator
+                chunk = []
+            chunk.append(dumps(row))
+        if ndjson:
+            yield separator.join(chunk) + '\n' if chunk else ''
+        else:
+            yield separator.join(chunk) + ']'
+
+    return Response(generate(), mimetype='application/x-ndjson' if ndjson else 'application/json')
+
 ## Top clerks in date range
 @snowpark.route('/top_clerks')
 def top_clerks():
@@ -17,20 +113,59 @@ def top_clerks():
     sdt_str = request.args.get('start_range') or '1995-01-01'
     edt_str = request.args.get('end_range') or '1995-03-31'
     topn_str = request.args.get('topn') or '10'
+    ndjson = request.args.get('format') == 'ndjson'
     try:
         sdt = datetime.datetime.strptime(sdt_str, dateformat)
         edt = datetime.datetime.strptime(edt_str, dateformat)
         topn = int(topn_str)
     except:
         abort(400, "Invalid arguments.")
+    if clerk_rollup is not None and clerk_rollup.ready():
+        clerks = clerk_rollup.top_clerks(sdt, edt, topn)
+        return stream_rows(clerks, ndjson) if ndjson else make_response(jsonify(clerks))
     try:
-        df = session.sql("SELECT * FROM Reference('ORDERS_TABLE')") \
-                .filter(f.col('O_ORDERDATE') >= sdt) \
-                .filter(f.col('O_ORDERDATE') <= edt) \
-                .group_by(f.col('O_CLERK')) \
-                .agg(f.sum(f.col('O_TOTALPRICE')).as_('CLERK_TOTAL')) \
-                .order_by(f.col('CLERK_TOTAL').desc()) \
-                .limit(topn)
-        return make_response(jsonify([x.as_dict() for x in df.to_local_iterator()]))
+        if topn >= stream_min_rows:
+            return stream_rows(iter_top_clerks(sdt, edt, topn), ndjson)
+        # Keyed on the parsed values, so '1995-1-1' and '1995-01-01' share an entry
+        key = (sdt.date(), edt.date(), topn)
+        clerks = top_clerks_cache.get_or_compute(
+            key, lambda: top_clerks_flights.do(key, lambda: query_top_clerks(sdt, edt, topn)))
+        return stream_rows(clerks, ndjson) if ndjson else make_response(jsonify(clerks))
     except:
         abort(500, "Error reading from Snowflake. Check the logs for details.")
+
+## Top clerks of several date ranges, e.g. every quarter of a year
+@snowpark.route('/top_clerks_batch', methods=['POST'])
+def top_clerks_batch():
+    # Validate arguments: {"windows": [{"start_range": ..., "end_range": ...}, ...], "topn": 10}
+    body = request.get_json(silent=True) or {}
+    try:
+        topn = int(body.get('topn') or 10)
+        windows = [(datetime.datetime.strptime(w['start_range'], dateformat),
+                    datetime.datetime.strptime(w['end_range'], dateformat)) for w in body['windows']]
+        if not 0 < len(windows) <= max_batch_windows:
+            raise ValueError(len(windows))
+    except:
+        abort(400, "Invalid arguments.")
+
+    if clerk_rollup is not None and clerk_rollup.ready():
+        results = [clerk_rollup.top_clerks(sdt, edt, topn) for sdt, edt in windows]
+    else:
+        # Windows already cached are reused; all the others cost a single query together
+        keys = [(sdt.date(), edt.date(), topn) for sdt, edt in windows]
+        results = [top_clerks_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, clerks in zip(keys, results) if clerks is None))
+        if missing:
+            try:
+                fetched = query_top_clerks_windows([(sdt, edt) for sdt, edt, _ in missing], topn)
+            except:
+                abort(500, "Error reading from Snowflake. Check the logs for details.")
+            for key, clerks in zip(missing, fetched):
+                top_clerks_cache.set(key, clerks)
+            fetched = dict(zip(missing, fetched))
+            results = [fetched[key] if clerks is None else clerks for key, clerks in zip(keys, results)]
+
+    return make_response(jsonify([
+        {'start_range': sdt.strftime(dateformat), 'end_range': edt.strftime(dateformat), 'clerks': clerks}
+        for (sdt, edt), clerks in zip(windows, results)
+    ]))
@@ -0,0 +1,108 @@
+from quart import Blueprint, request, abort, make_response, jsonify
+import asyncio
+import datetime
+import os
+import time
+
+from clerk_rollup import ClerkRollup
+from queries import top_clerks_df
+from spcs_helpers.cache import TTLCache
+from spcs_helpers.connection import session_pool
+from spcs_helpers.metrics import metrics, record_query
+from spcs_helpers.singleflight import AsyncSingleFlight
+# Sessions are only held while a query is submitted, not while it runs
+pool = session_pool()
+
+# Make the API endpoints
+snowpark = Blueprint('snowpark', __name__)
+
+dateformat = '%Y-%m-%d'
+
+top_clerks_cache = TTLCache(maxsize=int(os.getenv('TOP_CLERKS_CACHE_SIZE') or 256),
+                            ttl=float(os.getenv('TOP_CLERKS_CACHE_TTL') or 300))
+
+# Concurrent misses for the same window share one async job
+top_clerks_flights = AsyncSingleFlight()
+
+# In-memory daily per-clerk totals, off unless CLERK_ROLLUP=1 (see snowpark.py)
+clerk_rollup = None
+if (os.getenv('CLERK_ROLLUP') or '0') != '0':
+    clerk_rollup = ClerkRollup(pool, refresh_seconds=float(os.getenv('CLERK_ROLLUP_REFRESH') or 3600),
+                               max_cells=int(os.getenv('CLERK_ROLLUP_MAX_CELLS') or 5_000_000))
+    clerk_rollup.start()
+
+poll_interval = float(os.getenv('ASYNC_POLL_INTERVAL') or 0.02)
+max_poll_interval = float(os.getenv('ASYNC_MAX_POLL_INTERVAL') or 0.5)
+
+metrics.gauge('top_clerks_cache_hits_total', lambda: top_clerks_cache.hits, 'top_clerks cache hits', 'counter')
+metrics.gauge('top_clerks_cache_misses_total', lambda: top_clerks_cache.misses, 'top_clerks cache misses', 'counter')
+metrics.gauge('top_clerks_cache_hit_ratio',
+              lambda: top_clerks_cache.hits / max(1, top_clerks_cache.hits + top_clerks_cache.misses),
+              'Share of top_clerks cache lookups that hit')
+metrics.gauge('top_clerks_coalesced_total', lambda: top_clerks_flights.coalesced,
+              'top_clerks requests that waited for an identical query in flight', 'counter')
+metrics.gauge('snowflake_pool_sessions', lambda: pool.stats()['size'], 'Open pooled Snowflake sessions')
+metrics.gauge('snowflake_pool_idle_sessions', lambda: pool.stats()['idle'], 'Idle pooled Snowflake sessions')
+metrics.gauge('clerk_rollup_ready', lambda: int(clerk_rollup is not None and clerk_rollup.ready()),
+              'Whether top_clerks is answered from the in-memory rollup')
+
+async def collect_async(name, build):
+    """
+    Run the DataFrame returned by build(session) as a Snowflake async job and await its rows.
+
+    Its time and row count are recorded under `name` (see spcs_helpers.metrics).
+
+    Submitting (collect_nowait) and the status checks are short client calls
+    made on the default executor; while the query runs in the warehouse only a
+    timer on the event loop is waiting, so no thread is blocked per request.
+    The session goes back to the pool once the job is submitted, but stays
+    pinned until the job's rows are read, so the pool does not close it under
+    the job when replacing it.
+    """
+    def submit():
+        with pool.checkout() as session:
+            job = build(session).collect_nowait()
+            pool.pin(session)
+            return session, job
+
+    start = time.perf_counter()
+    session, job = await asyncio.to_thread(submit)
+    try:
+        interval = poll_interval
+        while not await asyncio.to_thread(job.is_done):
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_poll_interval)
+        rows = await asyncio.to_thread(job.result)
+    finally:
+        pool.unpin(session)
+    record_query(name, time.perf_counter() - start, len(rows), [job.query_id])
+    return rows
+
+async def query_top_clerks(sdt, edt, topn):
+    rows = await collect_async('top_clerks', lambda session: top_clerks_df(session, sdt, edt, topn))
+    return [x.as_dict() for x in rows]
+
+## Top clerks in date range
+@snowpark.route('/top_clerks')
+async def top_clerks():
+    # Validate arguments
+    sdt_str = request.args.get('start_range') or '1995-01-01'
+    edt_str = request.args.get('end_range') or '1995-03-31'
+    topn_str = request.args.get('topn') or '10'
+    try:
+        sdt = datetime.datetime.strptime(sdt_str, dateformat)
+        edt = datetime.datetime.strptime(edt_str, dateformat)
+        topn = int(topn_str)
+    except:
+        abort(400, "Invalid arguments.")
+    if clerk_rollup is not None and clerk_rollup.ready():
+        return await make_response(jsonify(clerk_rollup.top_clerks(sdt, edt, topn)))
+    key = (sdt.date(), edt.date(), topn)
+    clerks = top_clerks_cache.get(key)
+    if clerks is None:
+        try:
+            clerks = await top_clerks_flights.do(key, lambda: query_top_clerks(sdt, edt, topn))
+        except:
+            abort(500, "Error reading from Snowflake. Check the logs for details.")
+        top_clerks_cache.set(key, clerks)
+    return await make_response(jsonify(clerks))
@@ -1 +1 @@
-from .connection import connection, session
+from .connection import connection, session, SessionPool, session_pool
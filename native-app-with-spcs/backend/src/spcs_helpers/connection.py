@@ -1,16 +1,21 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 import snowflake.connector
 from snowflake.snowpark import Session
 
+TOKEN_FILE = "/snowflake/session/token"
+
 def connection() -> snowflake.connector.SnowflakeConnection:
-    if os.path.isfile("/snowflake/session/token"):
+    if os.path.isfile(TOKEN_FILE):
         creds = {
             'host': os.getenv('SNOWFLAKE_HOST'),
             'port': os.getenv('SNOWFLAKE_PORT'),
             'protocol': "https",
             'account': os.getenv('SNOWFLAKE_ACCOUNT'),
             'authenticator': "oauth",
-            'token': open('/snowflake/session/token', 'r').read(),
+            'token': open(TOKEN_FILE, 'r').read(),
             'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE'),
             'database': os.getenv('SNOWFLAKE_DATABASE'),
             'schema': os.getenv('SNOWFLAKE_SCHEMA'),
@@ -32,3 +37,152 @@ def connection() -> snowflake.connector.SnowflakeConnection:
 
 def session() -> Session:
     return Session.builder.configs({"connection": connection()}).create()
+
+
+def _token_mtime():
+    return os.path.getmtime(TOKEN_FILE) if os.path.isfile(TOKEN_FILE) else None
+
+class SessionPool:
+    """
+    Thread-safe pool of Snowpark sessions.
+
+    Requests check a session out, run their queries and return it, so
+    concurrent requests use separate connections instead of queueing behind
+    one. Between `min_size` and `max_size` sessions are kept; when all are busy
+    checkout waits up to `timeout` seconds. A session idle for longer than
+    `health_check_interval` seconds is checked with SELECT 1 before reuse, and
+    a session that fails the check, raised during use, or predates a rotation
+    of the SPCS OAuth token file is closed and replaced by a new one that
+    re-reads the token. A session pinned with pin() (e.g. by an async job still
+    polled on it after checkout) is only closed once its last pin is released.
+    """
+
+    def __init__(self, min_size=1, max_size=8, timeout=30, health_check_interval=60, factory=session):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.factory = factory
+        self._idle = []  # (session, token_mtime, last_used), most recently returned last
+        self._size = 0
+        self._pins = {}  # id(session) -> pins still held on it
+        self._retired = {}  # id(session) -> session to close at its last unpin
+        self._condition = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append(self._create())
+            self._size += 1
+
+    def _create(self):
+        return (self.factory(), _token_mtime(), time.monotonic())
+
+    def _usable(self, entry):
+        s, token_mtime, last_used = entry
+        if token_mtime != _token_mtime():
+            return False
+        if time.monotonic() - last_used > self.health_check_interval:
+            return self.healthy(s)
+        return True
+
+    @staticmethod
+    def healthy(s):
+        try:
+            s.sql("SELECT 1").collect()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(s):
+        try:
+            s.close()
+        except Exception:
+            pass
+
+    def _retire(self, s):
+        with self._condition:
+            if id(s) in self._pins:
+                self._retired[id(s)] = s
+                return
+        self._close(s)
+
+    def pin(self, s):
+        """Keep `s` open after it is returned, until the matching unpin, even if the pool replaces it"""
+        with self._condition:
+            self._pins[id(s)] = self._pins.get(id(s), 0) + 1
+
+    def unpin(self, s):
+        with self._condition:
+            self._pins[id(s)] -= 1
+            if self._pins[id(s)]:
+                return
+            del self._pins[id(s)]
+            retired = self._retired.pop(id(s), None)
+        if retired is not None:
+            self._close(retired)
+
+    def _acquire(self, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise TimeoutError("No Snowflake session available")
+            if self._idle:
+                entry = self._idle.pop()
+            else:
+                entry = None
+                self._size += 1
+
+        # Connecting and health checks run outside the lock
+        try:
+            if entry is not None and not self._usable(entry):
+                self._retire(entry[0])
+                entry = None
+            if entry is None:
+                entry = self._create()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        return entry[0], entry[1]
+
+    def _release(self, s, token_mtime, discard=False):
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((s, token_mtime, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            self._retire(s)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Session for the duration of a with block, replaced if it turns out broken"""
+        s, token_mtime = self._acquire(timeout)
+        broken = False
+        try:
+            yield s
+        except Exception:
+            broken = not self.healthy(s)
+            raise
+        finally:
+            # Also returned when a streaming generator holding it is closed early
+            self._release(s, token_mtime, discard=broken)
+
+    def stats(self):
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle), 'min_size': self.min_size, 'max_size': self.max_size}
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for s, _, _ in idle:
+            self._retire(s)
+
+def session_pool() -> SessionPool:
+    return SessionPool(min_size=int(os.getenv('SNOWFLAKE_POOL_MIN') or 1),
+                       max_size=int(os.getenv('SNOWFLAKE_POOL_MAX') or 8),
+                       timeout=float(os.getenv('SNOWFLAKE_POOL_TIMEOUT') or 30))
@@ -0,0 +1,143 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Metrics:
+    """
+    Counters, histograms and callback gauges rendered in the Prometheus text format.
+
+    Values are per process; under gunicorn each worker reports its own, so
+    scrape every worker or sum the series per instance.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def _declare(self, name, kind, help_text):
+        self._types.setdefault(name, kind)
+        if help_text:
+            self._help.setdefault(name, help_text)
+
+    def inc(self, name, labels=None, value=1, help_text=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._declare(name, 'counter', help_text)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None, help_text=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._declare(name, 'histogram', help_text)
+            counts, total = self._histograms.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._histograms[key] = (counts, total + value)
+
+    def gauge(self, name, fn, help_text=None, kind='gauge'):
+        """Report fn() when scraped, e.g. the size of a cache; kind='counter' for running totals"""
+        with self._lock:
+            self._declare(name, kind, help_text)
+            self._gauges[name] = fn
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+            gauges = dict(self._gauges)
+
+        samples = {}
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append(_sample(name, labels, value))
+        for (name, labels), (counts, total) in histograms.items():
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(_sample(name + '_bucket', labels + (('le', _format(bound)),), cumulative))
+            lines.append(_sample(name + '_sum', labels, total))
+            lines.append(_sample(name + '_count', labels, cumulative))
+        for name, fn in gauges.items():
+            try:
+                samples[name] = [_sample(name, (), fn())]
+            except Exception:
+                logging.exception("Metric %s failed", name)
+
+        out = []
+        for name in sorted(samples):
+            if name in self._help:
+                out.append(f"# HELP {name} {self._help[name]}")
+            out.append(f"# TYPE {name} {self._types[name]}")
+            out.extend(samples[name])
+        return '\n'.join(out) + '\n'
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _sample(name, labels, value):
+    if labels:
+        rendered = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+        return f"{name}{{{rendered}}} {_format(value)}"
+    return f"{name} {_format(value)}"
+
+# Registry shared by the app and the blueprint
+metrics = Metrics()
+
+slow_query_seconds = float(os.getenv('SLOW_QUERY_SECONDS') or 1.0)
+
+def record_query(name, seconds, rows, query_ids=()):
+    """Time and row count of one Snowflake query; slow ones are logged with their query IDs"""
+    metrics.observe('snowflake_query_duration_seconds', seconds, {'query': name},
+                    help_text='Snowflake query time as seen by the backend, including fetching the rows')
+    metrics.inc('snowflake_rows_returned_total', {'query': name}, rows,
+                help_text='Rows fetched from Snowflake')
+    if seconds >= slow_query_seconds:
+        logging.warning("Slow Snowflake query %s: %.3fs, %d rows, query_id=%s",
+                        name, seconds, rows, ','.join(query_ids) or 'unknown')
+
+@contextmanager
+def timed_query(session, name):
+    """
+    Time the queries a with block runs on `session` and record them with record_query.
+
+    Yields a dict; set its 'rows' entry to the number of rows fetched. Query
+    IDs come from the session's query history, so slow queries can be found in
+    QUERY_HISTORY.
+    """
+    result = {'rows': 0}
+    start = time.perf_counter()
+    with session.query_history() as history:
+        yield result
+    record_query(name, time.perf_counter() - start, result['rows'],
+                 [q.query_id for q in history.queries])
+
+def record_request(route, method, status, seconds, size=None):
+    labels = {'route': route, 'method': method, 'status': str(status)}
+    metrics.inc('http_requests_total', labels, help_text='HTTP requests served')
+    metrics.observe('http_request_duration_seconds', seconds, {'route': route},
+                    help_text='Time until the response starts, per route')
+    if size is not None:
+        metrics.inc('http_response_bytes_total', {'route': route}, size,
+                    help_text='Response body bytes serialized, per route')
+
+def count_bytes(route, chunks):
+    """Pass a streamed body through, adding its size to http_response_bytes_total once it is sent"""
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        metrics.inc('http_response_bytes_total', {'route': route}, size,
+                    help_text='Response body bytes serialized, per route')
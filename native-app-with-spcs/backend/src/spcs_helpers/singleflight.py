@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of do(key, fn) runs fn(); callers arriving with the same
+    key while it runs wait for it and receive the same result or exception.
+    Nothing is kept once the call finishes, so results are never stale.
+    `coalesced` counts the callers that did not run fn themselves.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop: do(key, fn) awaits fn() once per key in flight.
+
+    A caller that is cancelled (e.g. the client went away) stops waiting
+    without cancelling the shared call the others are still awaiting.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks = {}
+
+    async def do(self, key, fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)